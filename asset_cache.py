@@ -0,0 +1,124 @@
+"""Process-wide cache for figures, HTML and download payloads.
+
+Streamlit re-executes main.py on every widget change, for every session. Modules
+are imported once per server process, so the cache below is shared by all
+sessions. Entries are keyed by the files they were built from and are rebuilt
+when any of those files changes (mtime or size). The least recently used entries
+are evicted once the total exceeds the byte budget (TORPOR_CACHE_MB, default 256).
+"""
+import io, os, threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterable, Tuple, Union
+
+from PIL import Image
+
+import perf
+
+PathLike = Union[str, Path]
+
+# Images wider than this are downscaled by st.image on every call; do it once here.
+MAX_IMAGE_WIDTH = 1460
+
+
+def file_version(paths: Iterable[PathLike]) -> Tuple:
+    version = []
+    for path in paths:
+        stat = os.stat(path)
+        version.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class AssetCache:
+    """Thread-safe LRU cache with a byte budget and hit/miss counters."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple, object, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, paths: Iterable[PathLike], loader: Callable[[], object]):
+        """Return the cached value for `key`, calling `loader` if it is missing or
+        if any of `paths` changed since it was cached."""
+        version = file_version(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Load outside the lock so that a slow read does not block other sessions.
+        with perf.stage("load:" + str(key[0])):
+            value = loader()
+        size = _nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if size <= self.max_bytes:
+                self._entries[key] = (version, value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+CACHE = AssetCache(int(float(os.environ.get("TORPOR_CACHE_MB", "256")) * 1024 * 1024))
+
+
+def read_bytes(path: PathLike) -> bytes:
+    return CACHE.get(("bytes", str(path)), [path], lambda: Path(path).read_bytes())
+
+
+def _display_png(path: PathLike) -> bytes:
+    image = Image.open(path)
+    if image.width > MAX_IMAGE_WIDTH:
+        height = int(1.0 * image.height * MAX_IMAGE_WIDTH / image.width)
+        image = image.resize((MAX_IMAGE_WIDTH, height), resample=Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def load_image(path: PathLike) -> bytes:
+    """PNG bytes of a figure, decoded and downscaled once so that st.image can
+    send them without re-encoding."""
+    return CACHE.get(("image", str(path)), [path], lambda: _display_png(path))
@@ -0,0 +1,265 @@
+"""Headless benchmark of the app, replaying user sessions with Streamlit's AppTest.
+
+Usage: python bench.py [--sessions 1,2,4] [--rounds 2] [--out bench.jsonl]
+
+For every count in --sessions, that many sessions replay SCENARIO concurrently,
+--rounds times each. A session is one process (one app worker with its own
+asset cache), so the first round is cold and later rounds are warm. Every rerun
+is written as one JSON line:
+
+    {"sessions": 2, "session": 0, "round": 0, "step": 3, "action": "select vis1=Heart",
+     "wall_seconds": 0.041, "rchar": 1234, "read_bytes": 0, "sent_bytes": 51234,
+     "asset_bytes": 0,
+     "media_bytes": 0, "peak_rss": 212000000, "exceptions": 0, "stages": {...}}
+
+- rchar/read_bytes: bytes read by the process during the rerun (see perf.io_counters)
+- sent_bytes: size of the ForwardMsgs the rerun produced for the frontend. Like
+  the server, a large element that the browser still holds from the last
+  global.maxCachedMessageAge reruns of the session counts as its ref_hash
+  message rather than in full
+- asset_bytes: component files (Plotly, vocabularies, dataset columns) named in
+  the rerun's component arguments that the session had not fetched yet; the
+  browser caches them, so later reruns naming them again count nothing
+- media_bytes: images/downloads the rerun newly handed to the media file manager
+- peak_rss: peak resident set size of the session so far
+- stages: per-stage timings of the rerun (see perf.py)
+
+A summary per session count (median/p95 wall time, bytes, peak RSS) goes to stderr.
+Reruns that failed (an app exception, or a scenario step that could not be
+applied) are left out of the timings; the exit status is 1 if there were any.
+The network steps are skipped, not failed, when network.xlsx is not available.
+"""
+import argparse, json, multiprocessing, os, statistics, sys, time
+from pathlib import Path
+from typing import Dict, List
+
+APP_DIR = Path(__file__).resolve().parent
+
+# (action, widget key, value); "cycle" selects every option of a selectbox in turn.
+SCENARIO = [
+    ("radio", "section", "Overview"),
+    ("radio", "section", "Metabolome"),
+    ("cycle", "vis1", None),
+    ("cycle", "vis2", None),
+    ("toggle", "export-metabo", True),
+    ("toggle", "upset-metabo", True),
+    ("multiselect", "upset-include-metabo", [0, 1]),
+    ("radio", "section", "Transcriptome"),
+    ("cycle", "vis3", None),
+    ("cycle", "vis4", None),
+    ("slider", "fc-tran", 1.0),
+    ("radio", "section", "Proteome"),
+    ("cycle", "vis5", None),
+    ("cycle", "vis6", None),
+    ("toggle", "export-proteo", True),
+    ("radio", "section", "Phosphoproteome"),
+    ("cycle", "vis7", None),
+    ("cycle", "vis8", None),
+    ("radio", "section", "Concordance"),
+    ("radio", "conc-method", "spearman"),
+    ("select_slider", "conc-q", 0.05),
+    ("select_slider", "conc-q", 0.01),
+    ("selectbox", "conc-omics", "phospho"),
+    ("radio", "section", "Trans-omics network"),
+    ("text_input", "net-node", "hif"),
+    ("text_input", "net-node", "alb"),
+    ("radio", "net-query", "Path"),
+    ("text_input", "net-from", "hif1a"),
+    ("text_input", "net-to", "alb"),
+    ("radio", "net-query", "Feedback loops"),
+    ("slider", "net-loop-length", 4),
+    ("radio", "section", "Molecule search"),
+    ("text_input", "search", "hif"),
+    ("text_input", "search", "alb"),
+    ("radio", "section", "Metabolome"),
+]
+
+
+# Component arguments naming files the page fetches (see omics_plot.omics_plot)
+ASSET_ARGS = ("plotly_src", "vocabulary", "payload")
+
+
+def _measured_runner():
+    """Make AppTest record the bytes each rerun sends to the frontend."""
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.forward_msg_cache import create_reference_msg
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    from omics_plot import COMPONENT_DIR
+
+    class MeasuredScriptRunner(LocalScriptRunner):
+        sent_bytes = 0
+        asset_bytes = 0
+        media_bytes = 0
+        media_seen = set()
+        # What the browser of the current session holds: the rerun that last used
+        # each cached message, and the component files it fetched
+        reruns = 0
+        client_messages: Dict[str, int] = {}
+        client_assets = set()
+
+        @classmethod
+        def new_session(cls):
+            cls.reruns = 0
+            cls.client_messages = {}
+            cls.client_assets = set()
+
+        def run(self, *args, **kwargs):
+            tree = super().run(*args, **kwargs)
+            cls = MeasuredScriptRunner
+            cls.reruns += 1
+            max_age = config.get_option("global.maxCachedMessageAge")
+            cls.sent_bytes = cls.asset_bytes = 0
+            for msg in self.forward_msgs():
+                sent = msg
+                if msg.metadata.cacheable:
+                    if cls.reruns - cls.client_messages.get(msg.hash, -max_age - 1) <= max_age:
+                        sent = create_reference_msg(msg)
+                    cls.client_messages[msg.hash] = cls.reruns
+                cls.sent_bytes += sent.ByteSize()
+                if msg.delta.new_element.HasField("component_instance"):
+                    args = json.loads(msg.delta.new_element.component_instance.json_args)
+                    for value in (args.get(name) for name in ASSET_ARGS):
+                        if value and value not in cls.client_assets and (COMPONENT_DIR / value).is_file():
+                            cls.client_assets.add(value)
+                            cls.asset_bytes += (COMPONENT_DIR / value).stat().st_size
+            # The store holds every file so far; count the ones this rerun added.
+            files = Runtime.instance().media_file_mgr._storage._files_by_id
+            new = [f for file_id, f in files.items() if file_id not in MeasuredScriptRunner.media_seen]
+            cls.media_bytes = sum(len(f.content) for f in new)
+            cls.media_seen.update(files)
+            return tree
+
+    app_test.LocalScriptRunner = MeasuredScriptRunner
+    return MeasuredScriptRunner
+
+
+def _steps(at, scenario):
+    """Expand the scenario into (description, apply, skipped) triples against the
+    current app; apply is None for a widget that is not there."""
+    from network_graph import NETWORK_PATH
+
+    for action, key, value in scenario:
+        if key.startswith("net-") and not NETWORK_PATH.exists():
+            yield "{} {}={}".format(action, key, value), None, "network.xlsx not available"
+        elif action == "cycle":
+            try:
+                options = at.selectbox(key=key).options
+            except KeyError:
+                yield "cycle " + key, None, None
+                continue
+            for option in options[1:] + options[:1]:
+                yield "select {}={}".format(key, option), (lambda at, k=key, v=option: at.selectbox(key=k).set_value(v)), None
+        else:
+            yield "{} {}={}".format(action, key, value), (lambda at, a=action, k=key, v=value: getattr(at, a)(key=k).set_value(v)), None
+
+
+def _rerun(at, runner, apply) -> Dict:
+    import perf
+
+    perf.reset()
+    io_before = perf.io_counters()
+    start = time.perf_counter()
+    error = None
+    runner.sent_bytes = runner.asset_bytes = runner.media_bytes = 0
+    try:
+        if apply is not None:
+            apply(at)
+        at.run()
+    except Exception as e:  # a missing widget or a timeout; recorded, not fatal
+        error = repr(e)
+    wall = time.perf_counter() - start
+    io_after = perf.io_counters()
+    return {
+        "wall_seconds": round(wall, 6),
+        "rchar": io_after.get("rchar", 0) - io_before.get("rchar", 0),
+        "read_bytes": io_after.get("read_bytes", 0) - io_before.get("read_bytes", 0),
+        "sent_bytes": runner.sent_bytes,
+        "asset_bytes": runner.asset_bytes,
+        "media_bytes": runner.media_bytes,
+        "peak_rss": perf.peak_rss(),
+        "exceptions": len(at.exception) if error is None else 1,
+        "error": error,
+        "stages": perf.snapshot(),
+    }
+
+
+def run_session(sessions: int, session: int, rounds: int, barrier) -> List[Dict]:
+    """Replay SCENARIO `rounds` times in this process, as one session each time."""
+    os.chdir(APP_DIR)
+    sys.path.insert(0, str(APP_DIR))
+    import perf
+    from streamlit.testing.v1 import AppTest
+
+    perf.enable()
+    runner = _measured_runner()
+    barrier.wait()
+    results = []
+    for round_ in range(rounds):
+        at = AppTest.from_file("main.py", default_timeout=120)
+        runner.new_session()
+        row = {"sessions": sessions, "session": session, "round": round_}
+        results.append(dict(row, step=0, action="load", **_rerun(at, runner, None)))
+        for step, (action, apply, skipped) in enumerate(_steps(at, SCENARIO), 1):
+            if skipped:
+                results.append(dict(row, step=step, action=action, skipped=skipped))
+            elif apply is None:
+                results.append(dict(row, step=step, action=action, error="widget not found"))
+            else:
+                results.append(dict(row, step=step, action=action, **_rerun(at, runner, apply)))
+    return results
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def _failed(row: Dict) -> bool:
+    return bool(row.get("error") or row.get("exceptions"))
+
+
+def summarize(sessions: int, rows: List[Dict]) -> Dict:
+    timed = [r for r in rows if not _failed(r) and not r.get("skipped")]
+    warm = [r["wall_seconds"] for r in timed if r["round"] > 0]
+    return {
+        "sessions": sessions,
+        "reruns": len(timed),
+        "failed": sum(1 for r in rows if _failed(r)),
+        "wall_median": statistics.median(r["wall_seconds"] for r in timed) if timed else 0.0,
+        "wall_p95": _percentile([r["wall_seconds"] for r in timed], 0.95),
+        "warm_wall_median": statistics.median(warm) if warm else None,
+        "sent_bytes_per_session": sum(r["sent_bytes"] for r in timed) // sessions,
+        "asset_bytes_per_session": sum(r["asset_bytes"] for r in timed) // sessions,
+        "rchar_per_session": sum(r["rchar"] for r in timed) // sessions,
+        "peak_rss_max": max((r["peak_rss"] for r in timed), default=0),
+        "exceptions": sum(r.get("exceptions", 0) for r in rows),
+        "errors": sum(1 for r in rows if r.get("error")),
+        "skipped": sum(1 for r in rows if r.get("skipped")),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1", help="comma-separated numbers of concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=2, help="scenario replays per session (the first is cold)")
+    parser.add_argument("--out", help="JSON lines output (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    context = multiprocessing.get_context("spawn")
+    failed = False
+    for sessions in [int(n) for n in args.sessions.split(",")]:
+        with context.Manager() as manager, context.Pool(sessions) as pool:
+            barrier = manager.Barrier(sessions)
+            per_session = pool.starmap(run_session, [(sessions, i, args.rounds, barrier) for i in range(sessions)])
+        rows = [row for session in per_session for row in session]
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+        out.flush()
+        summary = summarize(sessions, rows)
+        print(json.dumps(summary), file=sys.stderr)
+        failed = failed or summary["exceptions"] > 0 or summary["errors"] > 0
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,48 @@
+"""Build the static assets of the omics plot component.
+
+Usage: python build_assets.py [plotly.min.js]
+
+Plotly is vendored as omics_html/component/plotly-<version>.<hash>.min.js, served
+with the component (see omics_plot.py); the content hash in the name lets
+browsers cache it indefinitely. Given a new plotly.min.js (after updating
+PLOTLY_VERSION), the script replaces the vendored file. In any case it writes
+- the vendored file precompressed as .gz and, if the brotli package is
+  installed, .br, for serve_assets.py (not committed)
+- assets.json, naming the vendored file
+"""
+import gzip, hashlib, json, sys
+from pathlib import Path
+
+from omics_plot import ASSET_MANIFEST, COMPONENT_DIR, PLOTLY_VERSION
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def write_hashed(stem: str, suffix: str, data: bytes) -> str:
+    name = stem + "." + hashlib.sha256(data).hexdigest()[:12] + suffix
+    path = COMPONENT_DIR / name
+    if not path.exists():
+        path.write_bytes(data)
+    # mtime=0 keeps the gzip output reproducible
+    (COMPONENT_DIR / (name + ".gz")).write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        (COMPONENT_DIR / (name + ".br")).write_bytes(brotli.compress(data, quality=11))
+    return name
+
+
+if __name__ == "__main__":
+    stem = "plotly-" + PLOTLY_VERSION
+    if len(sys.argv) > 1:
+        source = Path(sys.argv[1])
+    else:
+        source = COMPONENT_DIR / json.loads(ASSET_MANIFEST.read_text(encoding="utf-8"))["plotly"]
+    name = write_hashed(stem, ".min.js", source.read_bytes())
+    for old in COMPONENT_DIR.glob("plotly-*"):
+        if not old.name.startswith(name):
+            old.unlink()
+    ASSET_MANIFEST.write_text(json.dumps({"plotly": name}, indent=1), encoding="utf-8")
+    for path in sorted(COMPONENT_DIR.glob(stem + "*")):
+        print(path, path.stat().st_size, "bytes")
@@ -0,0 +1,60 @@
+"""Build width-stepped derivatives of paper_figs/*.png for responsive serving.
+
+Usage: python build_figures.py
+
+Writes to static/figs/ (served by Streamlit at app/static/figs/):
+- <stem>-<width>w.<hash>.webp for every width in WIDTHS below the original width
+- <stem>.<hash>.png, the full-resolution figure as an optimized PNG
+- manifest.json, listing the files and pixel sizes read by figures.py
+
+File names carry a content hash so that browsers can cache them indefinitely.
+"""
+import hashlib, io, json
+from pathlib import Path
+
+from PIL import Image
+
+from figures import FIG_DIR, MANIFEST_PATH, SOURCE_DIR
+
+WIDTHS = [480, 960, 1460]
+WEBP_QUALITY = 90
+
+
+def encode(image: Image.Image, format: str, **params) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **params)
+    return buffer.getvalue()
+
+
+def write_hashed(stem: str, suffix: str, data: bytes) -> str:
+    name = stem + "." + hashlib.sha256(data).hexdigest()[:12] + suffix
+    (FIG_DIR / name).write_bytes(data)
+    return name
+
+
+def build(source: Path) -> dict:
+    image = Image.open(source)
+    image.load()
+    variants = []
+    for width in WIDTHS:
+        if width >= image.width:
+            break
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), resample=Image.LANCZOS)
+        name = write_hashed(source.stem + "-" + str(width) + "w", ".webp", encode(resized, "WEBP", quality=WEBP_QUALITY, method=6))
+        variants.append({"width": width, "height": height, "file": name})
+    # Keep the original file when re-encoding does not make it smaller.
+    full = min(encode(image, "PNG", optimize=True), source.read_bytes(), key=len)
+    full = write_hashed(source.stem, ".png", full)
+    variants.append({"width": image.width, "height": image.height, "file": full})
+    return {"width": image.width, "height": image.height, "full": full, "variants": variants}
+
+
+if __name__ == "__main__":
+    FIG_DIR.mkdir(parents=True, exist_ok=True)
+    for old in FIG_DIR.iterdir():
+        old.unlink()
+    manifest = {source.stem: build(source) for source in sorted(SOURCE_DIR.glob("*.png"))}
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    total = sum((FIG_DIR / v["file"]).stat().st_size for m in manifest.values() for v in m["variants"])
+    print(len(manifest), "figures,", total, "bytes in", FIG_DIR)
@@ -0,0 +1,72 @@
+"""Compile the per-dataset plot pages under omics_html/ into the columnar store.
+
+Usage: python build_omics_store.py
+
+Also rebuilds the cross-omics molecule index (see molecule_index.py) and the
+fold-change matrices (see fc_matrix.py).
+
+Each page inlines its data as one `var allData = [...]` JSON literal in which every
+feature appears once as "All" and the significant ones are repeated as
+"Upregulated"/"Downregulated". The store keeps one row per feature. For layers
+plotted against -log10 P-value, q-values are derived per dataset.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from fc_matrix import build_all as build_matrices
+from molecule_index import build_index
+from omics_store import CATEGORIES, DATA_DIR, OMICS, P_VALUE_LAYERS, bh_qvalues, store_path
+
+HTML_DIR = Path("./omics_html")
+
+
+def read_all_data(path: Path) -> list:
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line.startswith("var allData = "):
+            return json.loads(line[len("var allData = "):].rstrip(";"))
+    raise ValueError("no allData literal in " + str(path))
+
+
+def to_columns(records: list) -> dict:
+    features = [r for r in records if r["category"] == "All"]
+    row = {r["text"]: i for i, r in enumerate(features)}
+    category = np.zeros(len(features), dtype=np.uint8)
+    for r in records:
+        if r["category"] != "All":
+            category[row[r["text"]]] = CATEGORIES.index(r["category"])
+    return {
+        "x": np.array([r["x"] for r in features], dtype=np.float32),
+        "y": np.array([r["y"] for r in features], dtype=np.float32),
+        "name": [r["text"] for r in features],
+        "category": category,
+    }
+
+
+def build(omics: str) -> Path:
+    datasets = {p.stem: to_columns(read_all_data(p)) for p in sorted((HTML_DIR / (omics + "_html")).glob("*.html"))}
+    names = np.array(sorted({n for d in datasets.values() for n in d["name"]}))
+    arrays = {"names": names, "datasets": np.array(list(datasets))}
+    for key, d in datasets.items():
+        arrays[key + "/x"] = d["x"]
+        arrays[key + "/y"] = d["y"]
+        arrays[key + "/name"] = np.searchsorted(names, d["name"]).astype(np.int32)
+        arrays[key + "/category"] = d["category"]
+        if omics in P_VALUE_LAYERS:
+            arrays[key + "/q"] = bh_qvalues(10.0 ** -d["y"].astype(np.float64)).astype(np.float32)
+    path = store_path(omics)
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+if __name__ == "__main__":
+    DATA_DIR.mkdir(exist_ok=True)
+    for omics in OMICS:
+        path = build(omics)
+        print(path, path.stat().st_size, "bytes")
+    path = build_index()
+    print(path, path.stat().st_size, "bytes")
+    for path in build_matrices():
+        print(path, path.stat().st_size, "bytes")
@@ -0,0 +1,170 @@
+"""On-demand exports served from a shared static cache.
+
+st.download_button reads its data on every rerun and registers a copy per
+session, whether or not anyone clicks it. Exports here are instead written once
+to static/exports/ (served by Streamlit at app/static/exports/) and offered as a
+plain download link. The file name carries a hash of the export's parameters and
+of the mtime/size of its sources, so a file is generated on the first request,
+shared by all sessions and processes, and regenerated only when a source
+changes. Without static file serving the exports fall back to st.download_button.
+Exports are kept within a byte budget (TORPOR_EXPORT_MB, default 512): whenever a
+new file is written, the least recently offered ones beyond it are removed.
+
+Besides whole workbooks, exports can be sliced to the current organ/comparison
+of an omics layer (with its categories under the current significance cutoffs)
+or to selected sheets of upset_plot.xlsx, as CSV or Parquet.
+"""
+import hashlib, html, os, shutil, time, uuid
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import asset_cache, omics_store, perf
+from upset_sets import UPSET_PATH, UPSET_PREFIX
+
+EXPORT_DIR = Path("./static/exports")
+EXPORT_URL = "app/static/exports/"
+
+MIMES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".csv": "text/csv",
+    ".parquet": "application/vnd.apache.parquet",
+}
+FORMATS = {"CSV": ".csv", "Parquet": ".parquet"}
+
+MAX_EXPORT_BYTES = int(float(os.environ.get("TORPOR_EXPORT_MB", "512")) * 1024 * 1024)
+# Temporary files older than this were left by an interrupted writer.
+STALE_TMP_SECONDS = 3600
+
+
+def sweep(max_bytes: int = MAX_EXPORT_BYTES):
+    """Remove the least recently offered exports beyond `max_bytes`, and stale temporary files."""
+    files = []
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:  # removed by another session meanwhile
+            continue
+        if entry.name.endswith(".tmp"):
+            if stat.st_mtime < time.time() - STALE_TMP_SECONDS:
+                Path(entry.path).unlink(missing_ok=True)
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        Path(path).unlink(missing_ok=True)
+        total -= size
+
+
+def export_file(file_name: str, sources: List[Path], writer: Callable[[Path], None], *params) -> Path:
+    """Path of the export, writing it with `writer` if it does not exist yet."""
+    digest = hashlib.sha256(repr((file_name, params, asset_cache.file_version(sources))).encode()).hexdigest()[:12]
+    stem, suffix = os.path.splitext(file_name)
+    path = EXPORT_DIR / (stem + "." + digest + suffix)
+    try:
+        os.utime(path)  # the mtime records when the export was last offered, for sweep()
+    except FileNotFoundError:
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        # Write under a unique name and rename, so concurrent sessions never see a partial file.
+        tmp = path.with_name(path.name + "." + uuid.uuid4().hex + ".tmp")
+        with perf.stage("export-write"):
+            writer(tmp)
+        os.replace(tmp, path)
+        sweep()
+    return path
+
+
+@perf.timed("download")
+def offer(label: str, path: Path, file_name: str, key: str):
+    if st.get_option("server.enableStaticServing"):
+        st.markdown(
+            '<a href="{url}" download="{name}" target="_self">⬇️ {label}</a>'.format(
+                url=EXPORT_URL + path.name, name=html.escape(file_name), label=html.escape(label)),
+            unsafe_allow_html=True,
+        )
+    else:
+        st.download_button(label=label, data=asset_cache.read_bytes(path), file_name=file_name,
+                           mime=MIMES[path.suffix], key=key)
+
+
+def write_table(df: pd.DataFrame, path: Path, suffix: str):
+    if suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def download_workbook(label: str, source: str, key: str):
+    """Offer a whole workbook (e.g. list.xlsx) for download."""
+    if not Path(source).exists():
+        st.info(source + " is not available in this deployment.")
+        return
+    path = export_file(source, [Path(source)], lambda tmp: shutil.copyfile(source, tmp))
+    offer(label, path, source, key)
+
+
+def _category_labels(category: np.ndarray) -> List[str]:
+    return [omics_store.CATEGORIES[c] if c else "n.s." for c in category.tolist()]
+
+
+def dataset_table(omics: str, organ: str, comp: str, q_max: Optional[float] = None,
+                  fc_min: float = 0.0) -> pd.DataFrame:
+    """One organ/comparison with its categories under the given cutoffs (see
+    omics_store.classify); with cutoffs, the published categories are kept alongside."""
+    data = omics_store.load_dataset(omics, organ, comp)
+    x_name, y_name = omics_store.AXES[omics]
+    table = pd.DataFrame({
+        "Feature": [name.strip() for name in data["name"].tolist()],
+        x_name: data["x"],
+        y_name: data["y"],
+    })
+    if q_max is not None:
+        table["Q-value (BH)"] = data["q"]
+    table["Category"] = _category_labels(omics_store.classify(data, omics, q_max, fc_min))
+    if q_max is not None or fc_min > 0:
+        table["Published category"] = _category_labels(data["category"])
+    return table
+
+
+def upset_sheets() -> List[str]:
+    return asset_cache.CACHE.get(("upset-sheets",), [UPSET_PATH], lambda: pd.ExcelFile(UPSET_PATH).sheet_names)
+
+
+def upset_table(sheets: List[str]) -> pd.DataFrame:
+    frames = []
+    for sheet, df in pd.read_excel(UPSET_PATH, sheet_name=sheets).items():
+        df = df.rename(columns={df.columns[2]: "Members"})
+        df.insert(0, "Sheet", sheet)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def export_controls(omics: str, organ: str, comp: str, q_max: Optional[float] = None, fc_min: float = 0.0):
+    """Sliced exports of the selected organ/comparison, categorized under the cutoffs
+    shown with its plot, and of the matching UpSet sheets."""
+    # A toggle, not an expander: see main.upset_explorer.
+    if st.toggle("Export the current selection (CSV or Parquet)", key="export-" + omics):
+        fmt = st.radio("Format:", list(FORMATS), horizontal=True, key="export-format-" + omics)
+        suffix = FORMATS[fmt]
+
+        file_name = omics + "_" + organ + "_" + comp.replace(" ", "_") + suffix
+        path = export_file(file_name, [omics_store.store_path(omics)],
+                           lambda tmp: write_table(dataset_table(omics, organ, comp, q_max, fc_min), tmp, suffix),
+                           q_max, fc_min)
+        cutoffs = " with the current cutoffs" if q_max is not None or fc_min > 0 else ""
+        offer("Download " + organ + " (" + comp + ")" + cutoffs, path, file_name, "download-dataset-" + omics)
+
+        sheets = [s for s in upset_sheets() if s.startswith(UPSET_PREFIX[omics])]
+        key = "export-sheets-" + omics + "-" + organ
+        st.session_state.setdefault(key, [s for s in sheets if organ in s])
+        chosen = st.multiselect("UpSet plot sheets:", sheets, key=key)
+        if chosen:
+            file_name = "upset_" + omics + suffix
+            path = export_file(file_name, [UPSET_PATH],
+                               lambda tmp: write_table(upset_table(chosen), tmp, suffix), tuple(chosen))
+            offer("Download the selected UpSet sheets", path, file_name, "download-upset-" + omics)
@@ -0,0 +1,128 @@
+"""Dense features x datasets fold-change matrices for cross-condition views.
+
+`build_omics_store.py` writes, per omics layer, the log2FC of every feature in
+every organ/comparison as one float32 matrix (omics_data/<omics>.log2fc.npy;
+NaN where a feature was not measured) and, for the layers with P-values, the
+matching q-values (<omics>.q.npy). Rows follow the "names" table of the store
+and columns its "datasets" list.
+
+The matrices are opened with mmap_mode="r": all sessions and worker processes
+read the same pages of the OS file cache instead of holding their own copies.
+Correlations, scatter data and discordant features are computed from them with
+whole-column numpy operations.
+"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from omics_store import DATA_DIR, FC_COLUMN, OMICS, P_VALUE_LAYERS, dataset_key, list_datasets, store_path
+
+
+def matrix_path(omics: str, column: str) -> Path:
+    return DATA_DIR / (omics + "." + column + ".npy")
+
+
+def build_matrix(omics: str) -> List[Path]:
+    with np.load(store_path(omics)) as store:
+        n_features = len(store["names"])
+    datasets = list_datasets(omics)
+    fc = np.full((n_features, len(datasets)), np.nan, dtype=np.float32)
+    q = np.full((n_features, len(datasets)), np.nan, dtype=np.float32)
+    with np.load(store_path(omics)) as store:
+        for j, key in enumerate(datasets):
+            rows = store[key + "/name"]
+            fc[rows, j] = store[key + "/" + FC_COLUMN[omics]]
+            if omics in P_VALUE_LAYERS:
+                q[rows, j] = store[key + "/q"]
+    paths = [matrix_path(omics, "log2fc")]
+    np.save(paths[0], fc)
+    if omics in P_VALUE_LAYERS:
+        paths.append(matrix_path(omics, "q"))
+        np.save(paths[1], q)
+    return paths
+
+
+class FoldChangeMatrix:
+    def __init__(self, omics: str):
+        self.omics = omics
+        with np.load(store_path(omics)) as store:
+            self.names = store["names"]
+            self.datasets = store["datasets"].tolist()
+        self.log2fc = np.load(matrix_path(omics, "log2fc"), mmap_mode="r")
+        q = matrix_path(omics, "q")
+        self.q = np.load(q, mmap_mode="r") if q.exists() else None
+
+    @staticmethod
+    def paths(omics: str) -> List[Path]:
+        """Files the matrix is read from, for cache versioning."""
+        return [store_path(omics)] + [p for p in (matrix_path(omics, "log2fc"), matrix_path(omics, "q")) if p.exists()]
+
+    @property
+    def nbytes(self) -> int:
+        # The mapped matrices live in the shared page cache, not in this process.
+        return self.names.nbytes
+
+    def column(self, organ: str, comp: str) -> int:
+        return self.datasets.index(dataset_key(organ, comp))
+
+    def _values(self, columns: List[int], q_max: Optional[float]) -> np.ndarray:
+        """log2FC of `columns`, NaN where the q-value is not below q_max."""
+        values = np.array(self.log2fc[:, columns])
+        if q_max is not None and self.q is not None:
+            values[~(self.q[:, columns] < q_max)] = np.nan
+        return values
+
+    def correlation(self, columns: Optional[List[int]] = None, method: str = "pearson",
+                    q_max: Optional[float] = None) -> pd.DataFrame:
+        """Correlation of the log2FC between datasets, over the features measured in
+        both of each pair (for "spearman", of their ranks among those features) and,
+        with q_max, significant in both."""
+        columns = list(range(len(self.datasets))) if columns is None else columns
+        values = self._values(columns, q_max)
+        labels = [self.datasets[c] for c in columns]
+        if method == "spearman":
+            # Ranks depend on the pair's shared features; pandas ranks per pair.
+            return pd.DataFrame(values, columns=labels).corr("spearman", min_periods=3).rename_axis(None)
+        present = np.isfinite(values).astype(np.float64)
+        x = np.where(present > 0, values, 0.0)
+        n = present.T @ present
+        sx = x.T @ present          # sum of column i over rows shared with column j
+        sxx = (x * x).T @ present
+        sxy = x.T @ x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = (n * sxy - sx * sx.T) / np.sqrt((n * sxx - sx ** 2) * (n * sxx.T - sx.T ** 2))
+        r[n < 3] = np.nan
+        return pd.DataFrame(r, index=labels, columns=labels)
+
+    def pair(self, a: int, b: int, q_max: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Row ids and log2FC of the features measured in both datasets a and b and,
+        with q_max, significant in both, as in correlation()."""
+        fc = np.array(self.log2fc[:, [a, b]])
+        keep = np.isfinite(fc).all(axis=1)
+        if q_max is not None and self.q is not None:
+            keep &= (np.array(self.q[:, [a, b]]) < q_max).all(axis=1)
+        rows = np.flatnonzero(keep)
+        return rows, fc[rows, 0], fc[rows, 1]
+
+    def scatter(self, a: int, b: int, q_max: Optional[float] = None) -> pd.DataFrame:
+        rows, x, y = self.pair(a, b, q_max)
+        return pd.DataFrame({"Feature": np.char.strip(self.names[rows]), self.datasets[a]: x, self.datasets[b]: y})
+
+    def discordant(self, a: int, b: int, limit: int = 20, q_max: Optional[float] = None) -> pd.DataFrame:
+        """Features changing in opposite directions in a and b, ranked by the smaller
+        of the two |log2FC| (large in both)."""
+        rows, x, y = self.pair(a, b, q_max)
+        opposite = np.flatnonzero(x * y < 0)
+        score = np.minimum(np.abs(x[opposite]), np.abs(y[opposite]))
+        top = opposite[np.argsort(-score, kind="stable")[:limit]]
+        return pd.DataFrame({
+            "Feature": np.char.strip(self.names[rows[top]]),
+            self.datasets[a]: x[top],
+            self.datasets[b]: y[top],
+        })
+
+
+def build_all() -> List[Path]:
+    return [path for omics in OMICS for path in build_matrix(omics)]
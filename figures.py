@@ -0,0 +1,52 @@
+"""Responsive serving of the paper figures.
+
+With Streamlit's static file serving enabled (.streamlit/config.toml) and the
+derivatives built by `build_figures.py`, figures are emitted as an <img srcset>
+so that the browser downloads the smallest variant that fits the container, and
+clicking a figure opens it at full resolution. Without them, figures fall back
+to st.image with the cached full-size PNG.
+"""
+import html, json
+from pathlib import Path
+
+import streamlit as st
+
+import asset_cache, perf
+
+SOURCE_DIR = Path("./paper_figs")
+FIG_DIR = Path("./static/figs")
+MANIFEST_PATH = FIG_DIR / "manifest.json"
+STATIC_URL = "app/static/figs/"
+
+
+def _manifest() -> dict:
+    if not st.get_option("server.enableStaticServing") or not MANIFEST_PATH.exists():
+        return {}
+    return asset_cache.CACHE.get(("figure-manifest",), [MANIFEST_PATH],
+                                 lambda: json.loads(MANIFEST_PATH.read_text(encoding="utf-8")))
+
+
+@perf.timed("figure")
+def show_figure(stem: str, sizes: str = "100vw"):
+    """Show paper_figs/<stem>.png. `sizes` is the rendered width of the figure
+    relative to the viewport, as in the HTML sizes attribute (e.g. "50vw" in a
+    two-column layout)."""
+    entry = _manifest().get(stem)
+    if entry is None:
+        st.image(asset_cache.load_image(SOURCE_DIR / (stem + ".png")), caption='', use_container_width=True)
+        return
+    srcset = ", ".join(STATIC_URL + v["file"] + " " + str(v["width"]) + "w" for v in entry["variants"])
+    st.markdown(
+        '<a href="{full}" target="_blank" title="Open full resolution">'
+        '<img src="{src}" srcset="{srcset}" sizes="{sizes}" width="{width}" height="{height}" '
+        'loading="lazy" alt="{alt}" style="width:100%;height:auto"></a>'.format(
+            full=STATIC_URL + entry["full"],
+            src=STATIC_URL + entry["variants"][0]["file"],
+            srcset=srcset,
+            sizes=html.escape(sizes),
+            width=entry["width"],
+            height=entry["height"],
+            alt=html.escape(stem),
+        ),
+        unsafe_allow_html=True,
+    )
@@ -1,22 +1,41 @@
 
-import os, io, re, glob, base64
-from typing import Dict, List, Optional
-from PIL import Image
+import os
+from typing import List
 import streamlit as st
-from streamlit.components.v1 import html as st_html
-from pathlib import Path
-import zipfile
+import pandas as pd
+import numpy as np
+import asset_cache, exports, fc_matrix, molecule_index, network_graph, omics_store, perf, upset_sets
+from figures import show_figure
+from omics_plot import dataset, omics_plot
 
-def render_html(html_text: str):
-    st.components.v1.html(html_text,width=40000, height=40000,scrolling=True)
-    
 st.set_page_config(page_title="A multi-tissue, multi-omics atlas of hypometabolism", page_icon="🧬", layout="wide")
 st.markdown("""<style>.big-title{font-size:2.1rem;font-weight:800;margin:0 0 .5rem 0}.subtle{opacity:.75}.pill{display:inline-block;padding:.15rem .6rem;border-radius:999px;border:1px solid #e6ebf2;background:#fff;margin-right:.25rem}.callout{padding:.9rem 1rem;border-radius:12px;background:#f6f8fb;border:1px solid #e6ebf2}.caption{font-size:.9rem;opacity:.8}</style>""", unsafe_allow_html=True)
+if os.environ.get("TORPOR_CACHE_STATS"):
+    st.sidebar.json(asset_cache.CACHE.stats())
 st.markdown('<div class="big-title">A multi-tissue, multi-omics atlas of hypometabolism</div>', unsafe_allow_html=True)
-tabs = st.tabs(["Overview","Metabolome","Transcriptome","Proteome","Phosphoproteome","Trans-omics network"])
+# Only the selected section is executed on each rerun (st.tabs runs all of them).
+nav = st.container()
+
+# Streamlit drops the state of widgets that are not rendered in a run; re-assigning
+# their values keeps them while another section is shown. This applies to every
+# widget whose key starts with one of PERSISTENT_KEYS. Such widgets take their
+# initial value from st.session_state.setdefault() rather than from value=,
+# index= or default=, which Streamlit reports as a conflict with the re-assignment.
+# Buttons cannot be assigned, so their keys must not match (see exports.offer).
+PERSISTENT_KEYS = ("vis", "search", "q-", "fc-", "upset-", "export-", "conc-", "net-")
+for key in list(st.session_state):
+    if isinstance(key, str) and key.startswith(PERSISTENT_KEYS):
+        st.session_state[key] = st.session_state[key]
 
+
+def select_match(container, hits: List[int], format_func, key: str) -> int:
+    """Selectbox over the matches of a search query. A kept choice that the current
+    query no longer matches is dropped, as Streamlit cannot show it."""
+    if key in st.session_state and st.session_state[key] not in hits:
+        del st.session_state[key]
+    return container.selectbox('Matching molecules:', hits, format_func=format_func, key=key)
     
-with tabs[0]:
+def overview():
     c1,c2 = st.columns([1.2,1])
     with c1:
         st.markdown("""
@@ -34,8 +53,7 @@ with tabs[0]:
         • Multi‑organ sampling: brain, heart, liver, kidney, skeletal muscle, brown adipose tissue (BAT), and plasma.  
         • Assays: capillary electrophoresis–mass spectrometry (metabolome), RNA‑seq (transcriptome), and liquid chromatography–mass spectrometry (proteome, phosphoproteome).  
         """)
-        image = Image.open('./paper_figs/Fig1.png')
-        st.image(image, caption='',use_container_width=True)
+        show_figure('Fig1', sizes="55vw")
     with c2:
         st.markdown("""
         <div class="callout">
@@ -47,8 +65,7 @@ with tabs[0]:
         • A transcription factor module establishes positive feedback loops that coordinate metabolism, antioxidant defenses, and platelet aggregation in both QIH and FIT.
         </div>
         """, unsafe_allow_html=True)
-        image = Image.open('./paper_figs/Fig2.png')
-        st.image(image, caption='',use_container_width=True)
+        show_figure('Fig2', sizes="45vw")
     st.markdown("""
             **License**  
             This web application is licensed free of charge for academic use and we shall not be liable for any direct, indirect, incidental, or consequential damages resulting from the use of this web app. In addition, we are under no obligation to provide maintenance, support, updates, enhancements, or modifications.
@@ -59,7 +76,7 @@ with tabs[0]:
         """)        
       
 
-with tabs[1]:
+def metabolome():
     st.markdown("""
         **Study design**  
         Mice were assigned to one of four experimental conditions: QIH (Q neuron–induced hypometabolism), 
@@ -67,8 +84,7 @@ with tabs[1]:
         After treatment, brain, heart, liver, kidney, skeletal muscle, brown adipose tissue (BAT), and plasma samples were collected 
         from each group (n = 10) for metabolomic profiling using capillary electrophoresis–mass spectrometry (CE-MS).  
         """)
-    image = Image.open('./paper_figs/Fig3.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig3')
     
     st.markdown("""
         **Metabolic pathway**  
@@ -78,13 +94,11 @@ with tabs[1]:
         Colored triangles mark metabolites that are significantly altered (Q < 0.05) in the QIH vs CNO or FIT vs Ad lib comparisons. 
         Black crosses denote missing data for the corresponding tissue-condition pair. 
         """)
-    image = Image.open('./paper_figs/Fig4.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig4')
     
     options1 = ['Brain',"Heart" ,"Liver","Kidney",'Muscle','BAT', 'Plasma']
     Organ= st.selectbox('Organ for visualization:',options1, key='vis1')
-    image = Image.open('./paper_figs/'+Organ+'_meta.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure(Organ+'_meta')
     st.markdown("""
         Left panel shows the principal component analysis (PCA) plot with 95% 
         confidence ellipses of metabolite profiles. 
@@ -95,30 +109,18 @@ with tabs[1]:
         gray bars represent the total number of altered metabolites per condition.
         """)
     
-    with open("list.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the volcano plots",
-            data=f,
-            file_name="list.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main"
-        )
-
-    with open("upset_plot.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the UpSet plots",
-            data=f,
-            file_name="upset_plot.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main2"
-        )
+    exports.download_workbook("Download the underlying data for the volcano plots", "list.xlsx", key="download-results-main")
+
+    exports.download_workbook("Download the underlying data for the UpSet plots", "upset_plot.xlsx", key="download-results-main2")
+    upset_explorer("metabo", Organ)
                 
     options2 = ['QIH vs CNO',"FIT vs Ad lib" ,"QIH vs FIT"]
     Comp= st.selectbox('Comparison for visualization:',options2, key='vis2')
-    DEFAULT_HTML_PATH = Path("./omics_html/metabo_html/"+Organ+" ("+Comp+").html")
-    html_text = DEFAULT_HTML_PATH.read_text(encoding="utf-8", errors="ignore")
-    render_html(html_text)
+    q_max, fc_min = volcano("metabo", Organ, Comp)
+    exports.export_controls("metabo", Organ, Comp, q_max, fc_min)
     
     
-with tabs[2]:
+def transcriptome():
     st.markdown("""
         **Study design**  
         Mice were assigned to one of four experimental conditions: QIH (Q neuron–induced hypometabolism), 
@@ -126,13 +128,11 @@ with tabs[2]:
         Liver and skeletal muscle were collected after 10 hours of intervention (n = 10 per group) 
         for transcriptome analysis using RNA sequencing (RNA-seq).  
         """)
-    image = Image.open('./paper_figs/Fig5.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig5')
     
     options3 = ["Liver",'Muscle']
     Organ= st.selectbox('Organ for visualization:',options3, key='vis3')
-    image = Image.open('./paper_figs/'+Organ+'_tra.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure(Organ+'_tra')
     st.markdown("""
         Left panel shows the principal component analysis (PCA) plot with 95% 
         confidence ellipses of transcriptomic profiles. 
@@ -143,29 +143,17 @@ with tabs[2]:
         gray bars represent the total number of altered genes per condition.
         """)
     
-    with open("list.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the MA plots",
-            data=f,
-            file_name="list.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main3"
-        )
-
-    with open("upset_plot.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the UpSet plots",
-            data=f,
-            file_name="upset_plot.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main4"
-        )
+    exports.download_workbook("Download the underlying data for the MA plots", "list.xlsx", key="download-results-main3")
+
+    exports.download_workbook("Download the underlying data for the UpSet plots", "upset_plot.xlsx", key="download-results-main4")
+    upset_explorer("tran", Organ)
                 
     options2 = ['QIH vs CNO',"FIT vs Ad lib" ,"QIH vs FIT"]
     Comp= st.selectbox('Comparison for visualization:',options2, key='vis4')
-    DEFAULT_HTML_PATH = Path("./omics_html/tran_html/"+Organ+" ("+Comp+").html")
-    html_text = DEFAULT_HTML_PATH.read_text(encoding="utf-8", errors="ignore")
-    render_html(html_text)
+    q_max, fc_min = volcano("tran", Organ, Comp)
+    exports.export_controls("tran", Organ, Comp, q_max, fc_min)
 
-with tabs[3]:
+def proteome():
     st.markdown("""
         **Study design**  
         Mice were assigned to one of four experimental conditions: QIH (Q neuron–induced hypometabolism), 
@@ -173,13 +161,11 @@ with tabs[3]:
         Liver and skeletal muscle were collected after 10 hours of intervention (n = 10 per group) 
         for proteomic analysis using liquid chromatography–mass spectrometry (LC-MS).   
         """)
-    image = Image.open('./paper_figs/Fig10.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig10')
     
     options3 = ["Liver",'Muscle']
     Organ= st.selectbox('Organ for visualization:',options3, key='vis5')
-    image = Image.open('./paper_figs/'+Organ+'_pro.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure(Organ+'_pro')
     st.markdown("""
         Left panel shows the principal component analysis (PCA) plot with 95% 
         confidence ellipses of proteomic profiles. 
@@ -190,29 +176,17 @@ with tabs[3]:
         gray bars represent the total number of altered proteins per condition.
         """)
     
-    with open("list.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the volcano plots",
-            data=f,
-            file_name="list.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main5"
-        )
-
-    with open("upset_plot.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the UpSet plots",
-            data=f,
-            file_name="upset_plot.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main6"
-        )
+    exports.download_workbook("Download the underlying data for the volcano plots", "list.xlsx", key="download-results-main5")
+
+    exports.download_workbook("Download the underlying data for the UpSet plots", "upset_plot.xlsx", key="download-results-main6")
+    upset_explorer("proteo", Organ)
                 
     options2 = ['QIH vs CNO',"FIT vs Ad lib" ,"QIH vs FIT"]
     Comp= st.selectbox('Comparison for visualization:',options2, key='vis6')
-    DEFAULT_HTML_PATH = Path("./omics_html/proteo_html/"+Organ+" ("+Comp+").html")
-    html_text = DEFAULT_HTML_PATH.read_text(encoding="utf-8", errors="ignore")
-    render_html(html_text)
+    q_max, fc_min = volcano("proteo", Organ, Comp)
+    exports.export_controls("proteo", Organ, Comp, q_max, fc_min)
 
-with tabs[4]:
+def phosphoproteome():
     st.markdown("""
         **Study design**  
         Mice were assigned to one of four experimental conditions: QIH (Q neuron–induced hypometabolism), 
@@ -220,13 +194,11 @@ with tabs[4]:
         Liver and skeletal muscle samples were collected after 10 hours of intervention (n = 10 per group) 
         and subjected to phosphoproteomic analysis using liquid chromatography–mass spectrometry (LC-MS).   
         """)
-    image = Image.open('./paper_figs/Fig6.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig6')
     
     options4 = ["Liver",'Muscle']
     Organ= st.selectbox('Organ for visualization:',options4, key='vis7')
-    image = Image.open('./paper_figs/'+Organ+'_pho.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure(Organ+'_pho')
     st.markdown("""
         Left panel shows the principal component analysis (PCA) plot with 95% 
         confidence ellipses of phosphoproteome profiles. 
@@ -237,29 +209,17 @@ with tabs[4]:
         gray bars represent the total number of altered phosphosites per condition.
         """)
     
-    with open("list.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the volcano plots",
-            data=f,
-            file_name="list.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main7"
-        )
-
-    with open("upset_plot.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the UpSet plots",
-            data=f,
-            file_name="upset_plot.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main8"
-        )
+    exports.download_workbook("Download the underlying data for the volcano plots", "list.xlsx", key="download-results-main7")
+
+    exports.download_workbook("Download the underlying data for the UpSet plots", "upset_plot.xlsx", key="download-results-main8")
+    upset_explorer("phospho", Organ)
                 
     options2 = ['QIH vs CNO',"FIT vs Ad lib" ,"QIH vs FIT"]
     Comp= st.selectbox('Comparison for visualization:',options2, key='vis8')
-    DEFAULT_HTML_PATH = Path("./omics_html/phospho_html/"+Organ+" ("+Comp+").html")
-    html_text = DEFAULT_HTML_PATH.read_text(encoding="utf-8", errors="ignore")
-    render_html(html_text)
+    q_max, fc_min = volcano("phospho", Organ, Comp)
+    exports.export_controls("phospho", Organ, Comp, q_max, fc_min)
     
-with tabs[5]:
+def trans_omics_network():
     st.markdown("""
         **Study design**  
         Extracellular ligands and metabolites regulate intracellular signaling pathways through receptors and transporters. 
@@ -270,8 +230,7 @@ with tabs[5]:
         metabolomic, transcriptomic, proteomic, and phosphoproteomic datasets. 
         We then analyzed the network architecture based on topological features, such as degree distribution and motif structures.  
         """)
-    image = Image.open('./paper_figs/Fig7.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig7')
 
     st.markdown("""
         **Trans-omics networks**  
@@ -282,8 +241,7 @@ with tabs[5]:
         Numeric annotations show the number of regulated elements within and between each molecular layer 
         (e.g., transcription factors, transporters, enzymes, reactions, and metabolites).  
         """)
-    image = Image.open('./paper_figs/Fig8.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig8')
     
     
     st.markdown("""
@@ -291,8 +249,9 @@ with tabs[5]:
         All mRNAs in the networks increased significantly in QIH or FIT. 
         Bar plots show the number of downstream molecular targets regulated by each gene circuit.  
         """)
-    image = Image.open('./paper_figs/Fig9.png')
-    st.image(image, caption='',use_container_width=True)
+    show_figure('Fig9')
+
+    network_explorer()
 
     st.markdown("""
 **Trans-omics networks were infered using the following 10-step workflow**  
@@ -331,10 +290,227 @@ with tabs[5]:
     We identified allosteric regulation of metabolic reactions by metabolites using the BRENDA database (mammalian activators/inhibitors). Taxonomic information was obtained from NCBI. BRENDA compound names were mapped to KEGG compound IDs using InChI keys or KEGG/HMDB names. 
 """)
 
-    with open("network.xlsx", "rb") as f:
-        st.download_button(
-            label="Download the underlying data for the trans-omics networks",
-            data=f,
-            file_name="network.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",key="download-results-main9"
-        )
\ No newline at end of file
+    exports.download_workbook("Download the underlying data for the trans-omics networks", "network.xlsx", key="download-results-main9")
+
+def volcano(omics: str, organ: str, comp: str):
+    """Significance cutoffs, counts and the plot of one dataset; returns the cutoffs."""
+    data = dataset(omics, organ, comp)
+    c1, c2 = st.columns(2)
+    q_max = None
+    if "q" in data:
+        q_max = c1.select_slider('Q-value cutoff:', [None, 0.001, 0.005, 0.01, 0.05, 0.1, 0.2],
+                                 format_func=lambda q: "as published" if q is None else "Q < {}".format(q),
+                                 key="q-" + omics)
+    else:
+        c1.caption("The RNA-seq plots carry no P-values: significance follows the published calls (Q < 0.01) "
+                   "and can only be narrowed by fold change.")
+    fc_min = c2.slider('|log2FC| cutoff:', 0.0, 3.0, step=0.1, key="fc-" + omics)  # starts at min_value
+    category = omics_store.classify(data, omics, q_max, fc_min)
+    up, down = np.bincount(category, minlength=3)[1:].tolist()
+    caption = "{} up and {} down of {} features".format(up, down, len(category))
+    if q_max is not None or fc_min > 0:
+        published = np.bincount(data["category"], minlength=3)
+        caption += " (published: {} up, {} down)".format(published[1], published[2])
+    if q_max is not None:
+        caption += ". Q-values are recomputed (Benjamini-Hochberg) from the plotted P-values."
+    st.caption(caption)
+    omics_plot(omics, organ, comp, category)
+    return q_max, fc_min
+
+def upset_spec(sets: upset_sets.MembershipSets, chosen: List[int]) -> dict:
+    """Vega-Lite UpSet plot: sizes of the exclusive intersections above their membership matrix."""
+    intersections = sets.intersections(chosen)
+    bars = [{"id": i, "size": size} for i, (combo, size) in enumerate(intersections)]
+    dots = [{"id": i, "set": sets.label(s), "member": s in combo}
+            for i, (combo, _) in enumerate(intersections) for s in chosen]
+    x = {"field": "id", "type": "ordinal", "axis": None}
+    return {
+        "vconcat": [
+            {"data": {"values": bars}, "mark": "bar", "height": 180, "width": {"step": 22},
+             "encoding": {"x": x, "y": {"field": "size", "type": "quantitative", "title": "Intersection size"},
+                          "tooltip": [{"field": "size", "title": "Features"}]}},
+            {"data": {"values": dots}, "mark": {"type": "circle", "size": 90}, "width": {"step": 22},
+             "encoding": {"x": x, "y": {"field": "set", "type": "nominal", "title": None,
+                                        "sort": [sets.label(s) for s in chosen]},
+                          "color": {"field": "member", "type": "nominal", "legend": None,
+                                    "scale": {"domain": [True, False], "range": ["black", "#e0e0e0"]}}}},
+        ],
+        "spacing": 4,
+    }
+
+def upset_explorer(omics: str, organ: str):
+    """Live UpSet plot and set algebra over the memberships in upset_plot.xlsx."""
+    # Unlike an expander, the toggle keeps the body from running until someone asks.
+    if not st.toggle("Compare significant features across organs and comparisons", key="upset-" + omics):
+        return
+    sets = asset_cache.CACHE.get(("upset-sets",), [upset_sets.UPSET_PATH], upset_sets.load)[omics]
+    ids = list(range(len(sets.labels)))
+    # One selection per organ, starting from the sets of that organ
+    key = "upset-sets-" + omics + "-" + organ
+    st.session_state.setdefault(key, [i for i in ids if sets.labels[i][0] == organ])
+    chosen = st.multiselect('Sets for the UpSet plot:', ids, format_func=sets.label, max_selections=8, key=key)
+    if chosen:
+        st.vega_lite_chart(spec=upset_spec(sets, chosen))
+
+    c1, c2, c3 = st.columns([2, 2, 1])
+    include = c1.multiselect('Significant in:', ids, format_func=sets.label, key="upset-include-" + omics)
+    exclude = c2.multiselect('But not in:', ids, format_func=sets.label, key="upset-exclude-" + omics)
+    mode = c3.radio('Combine:', ["all", "any"], horizontal=True, key="upset-mode-" + omics)
+    if include:
+        bits = sets.combine(include, exclude, mode)
+        st.markdown("**{}** features".format(sets.count(bits)))
+        st.dataframe(pd.DataFrame({"Feature": sets.members(bits)}), hide_index=True, height=250)
+
+def concordance():
+    st.markdown("""
+        **Concordance across conditions and organs**  
+        Agreement of the log2 fold changes between the organs and comparisons of one omics layer: correlations between 
+        all datasets, the fold changes of two datasets against each other, and the features changing in opposite directions.
+        """)
+    c1, c2, c3 = st.columns(3)
+    omics = c1.selectbox('Omics layer:', list(omics_store.OMICS_LABELS), format_func=omics_store.OMICS_LABELS.get,
+                         key='conc-omics')
+    matrix = asset_cache.CACHE.get(("fc-matrix", omics), fc_matrix.FoldChangeMatrix.paths(omics),
+                                   lambda: fc_matrix.FoldChangeMatrix(omics))
+    method = c2.radio('Correlation:', ["pearson", "spearman"], format_func=str.capitalize, horizontal=True,
+                      key='conc-method')
+    q_max = None
+    if matrix.q is not None:
+        q_max = c3.select_slider('Features:', [None, 0.05, 0.01], key='conc-q',
+                                 format_func=lambda q: "all" if q is None else "Q < {} in both".format(q),
+                                 help="With a cutoff, each pair of datasets is compared over the features "
+                                      "significant in both.")
+    else:
+        c3.caption("The RNA-seq results carry no q-values; all features are used.")
+
+    corr = asset_cache.CACHE.get(("fc-correlation", omics, method, q_max), fc_matrix.FoldChangeMatrix.paths(omics),
+                                 lambda: matrix.correlation(method=method, q_max=q_max))
+    cells = corr.rename_axis("a").reset_index().melt(id_vars="a", var_name="b", value_name="r").dropna()
+    st.vega_lite_chart(cells, {
+        "mark": "rect",
+        "encoding": {
+            "x": {"field": "b", "type": "nominal", "title": None, "sort": list(corr.columns)},
+            "y": {"field": "a", "type": "nominal", "title": None, "sort": list(corr.index)},
+            "color": {"field": "r", "type": "quantitative", "scale": {"scheme": "redblue", "domain": [-1, 1], "reverse": True}},
+            "tooltip": [{"field": "a"}, {"field": "b"}, {"field": "r", "format": ".2f"}],
+        },
+        "width": {"step": 28}, "height": {"step": 28},
+    })
+
+    c1, c2 = st.columns(2)
+    st.session_state.setdefault('conc-x-' + omics, next((d for d in matrix.datasets if "QIH vs CNO" in d), matrix.datasets[0]))
+    st.session_state.setdefault('conc-y-' + omics, next((d for d in matrix.datasets if "FIT vs Ad lib" in d), matrix.datasets[0]))
+    x = c1.selectbox('x axis:', matrix.datasets, key='conc-x-' + omics)
+    y = c2.selectbox('y axis:', matrix.datasets, key='conc-y-' + omics)
+    a, b = matrix.datasets.index(x), matrix.datasets.index(y)
+    points = matrix.scatter(a, b, q_max)
+    st.vega_lite_chart(points, {
+        "mark": {"type": "circle", "size": 12, "opacity": 0.4},
+        "encoding": {
+            "x": {"field": x, "type": "quantitative", "title": "log2FC " + x},
+            "y": {"field": y, "type": "quantitative", "title": "log2FC " + y},
+            "tooltip": [{"field": "Feature"}, {"field": x, "format": ".2f"}, {"field": y, "format": ".2f"}],
+        },
+        "params": [{"name": "zoom", "select": "interval", "bind": "scales"}],
+    }, use_container_width=True)
+    st.caption("{} features measured in both{}.".format(len(points), "" if q_max is None else " and significant in both"))
+    st.markdown("**Top discordant features** (opposite directions, ranked by the smaller |log2FC|)")
+    st.dataframe(matrix.discordant(a, b, 20, q_max), hide_index=True, use_container_width=True)
+
+def network_explorer():
+    st.markdown("""
+        **Explore the networks**  
+        Query the trans-omics networks behind Fig. 8 and 9: neighborhoods of a molecule, shortest regulatory paths 
+        between two molecules, the edges between selected layers, and feedback loops. 
+        Results are listed in full and drawn up to {} edges.
+        """.format(network_graph.MAX_RENDER_EDGES))
+    if not network_graph.NETWORK_PATH.exists():
+        st.info("The network tables (network.xlsx) are not available in this deployment.")
+        return
+    graph = asset_cache.CACHE.get(("network",), [network_graph.NETWORK_PATH],
+                                  lambda: network_graph.NetworkGraph.load(network_graph.NETWORK_PATH))
+
+    c1, c2 = st.columns(2)
+    condition = c1.selectbox('Network:', ["All"] + graph.conditions, key='net-condition')
+    st.session_state.setdefault('net-layers', graph.layers)
+    layers = c2.multiselect('Layers:', graph.layers, key='net-layers')
+    mask = graph.edge_mask(None if condition == "All" else condition, layers)
+    query = st.radio('Query:', ["Neighborhood", "Path", "Layers", "Feedback loops"], horizontal=True, key='net-query')
+
+    highlight = []
+    if query == "Neighborhood":
+        c1, c2, c3 = st.columns([2, 1, 1])
+        hits = graph.search(c1.text_input('Molecule:', key='net-node'))
+        if not hits:
+            return
+        node = select_match(c1, hits, graph.names.__getitem__, 'net-node-hit')
+        hops = c2.slider('Steps:', 1, 5, key='net-hops')
+        direction = c3.selectbox('Direction:', list(network_graph.DIRECTIONS), key='net-direction')
+        edges = graph.neighborhood([node], hops, network_graph.DIRECTIONS[direction], mask)
+        highlight = [node]
+    elif query == "Path":
+        c1, c2 = st.columns(2)
+        sources = graph.search(c1.text_input('From:', key='net-from'))
+        targets = graph.search(c2.text_input('To:', key='net-to'))
+        if not sources or not targets:
+            return
+        source = select_match(c1, sources, graph.names.__getitem__, 'net-from-hit')
+        target = select_match(c2, targets, graph.names.__getitem__, 'net-to-hit')
+        edges = graph.shortest_paths(source, target, mask)
+        highlight = [source, target]
+    elif query == "Layers":
+        edges = np.flatnonzero(mask)
+    else:
+        c1, c2 = st.columns(2)
+        st.session_state.setdefault('net-loop-length', 4)
+        st.session_state.setdefault('net-positive', True)
+        length = c1.slider('Maximum loop length:', 2, 6, key='net-loop-length')
+        positive = c2.checkbox('Positive feedback only', key='net-positive')
+        loops, complete = graph.feedback_loops(length, mask, positive)
+        st.caption("{} loops found{}.".format(len(loops), " (showing the first 100)" if len(loops) == 100 else ""))
+        if not complete:
+            st.info("The search was cut short: there are too many paths to follow at this length. "
+                    "Shorter loops or fewer layers give a complete search.")
+        edges = np.unique(np.concatenate(loops)) if loops else np.zeros(0, dtype=np.int32)
+
+    if not len(edges):
+        st.info("No matching edges.")
+        return
+    st.graphviz_chart(graph.to_dot(edges, highlight), use_container_width=True)
+    st.dataframe(graph.to_frame(edges), hide_index=True, use_container_width=True)
+
+def molecule_search():
+    st.markdown("""
+        **Molecule search**  
+        Look up a gene, protein, phosphosite or metabolite across all omics layers, organs and comparisons. 
+        Matching is case-insensitive and also finds partial names (e.g. "hif" finds Hif1a and Hif3a).
+        Significance follows the cutoffs used in each tab (Q < 0.01 for RNA-seq, Q < 0.05 otherwise).
+        """)
+    query = st.text_input('Molecule name:', key='search')
+    if not query:
+        return
+    index = asset_cache.CACHE.get(("molecule-index",), [molecule_index.INDEX_PATH], molecule_index.MoleculeIndex.load)
+    hits = index.search(query)
+    if not hits:
+        st.info("No matching molecules found.")
+        return
+    key_id = select_match(st, hits, index.name, 'search-hit')
+    results = pd.DataFrame(index.lookup(key_id))
+    results["omics"] = results["omics"].map(omics_store.OMICS_LABELS)
+    results.columns = ["Omics", "Organ", "Comparison", "log2FC", "Significance"]
+    st.dataframe(results, hide_index=True, use_container_width=True)
+
+SECTIONS = {
+    "Overview": overview,
+    "Metabolome": metabolome,
+    "Transcriptome": transcriptome,
+    "Proteome": proteome,
+    "Phosphoproteome": phosphoproteome,
+    "Concordance": concordance,
+    "Trans-omics network": trans_omics_network,
+    "Molecule search": molecule_search,
+}
+with nav:
+    section = st.radio("Section", list(SECTIONS), horizontal=True, key="section", label_visibility="collapsed")
+with perf.stage("section:" + section):
+    SECTIONS[section]()
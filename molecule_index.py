@@ -0,0 +1,141 @@
+"""Cross-omics molecule lookup.
+
+One index over every omics layer, organ and comparison in the columnar store,
+written by `build_omics_store.py` to omics_data/index.npz:
+
+- keys: sorted, normalized names (stripped and lower-cased; transcriptome names
+  carry a leading space, e.g. " Alb")
+- a CSR posting list per key with the dataset, log2FC and category of each
+  occurrence, so that lookups never touch the per-dataset store
+- a CSR trigram -> key table for substring lookup
+"""
+import bisect
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from omics_store import CATEGORIES, DATA_DIR, FC_COLUMN, OMICS, load_dataset, list_datasets
+
+INDEX_PATH = DATA_DIR / "index.npz"
+
+
+def normalize(name: str) -> str:
+    return name.strip().lower()
+
+
+def trigrams(key: str) -> List[str]:
+    return [key[i:i + 3] for i in range(len(key) - 2)]
+
+
+def _csr(groups: Dict[object, List[int]], order: List[object]):
+    indptr = np.zeros(len(order) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(groups[k]) for k in order])
+    indices = np.concatenate([np.asarray(groups[k], dtype=np.int64) for k in order]) if order else np.zeros(0, np.int64)
+    return indptr, indices
+
+
+def build_index(path: Path = INDEX_PATH) -> Path:
+    datasets, postings, display = [], {}, {}
+    fc, category, dataset = [], [], []
+    for omics in OMICS:
+        for key in list_datasets(omics):
+            organ, comp = key[:-1].split(" (", 1)
+            data = load_dataset(omics, organ, comp)
+            ds = len(datasets)
+            datasets.append(omics + "/" + key)
+            for name, value, cat in zip(data["name"].tolist(), data[FC_COLUMN[omics]].tolist(), data["category"].tolist()):
+                norm = normalize(name)
+                display.setdefault(norm, name.strip())
+                postings.setdefault(norm, []).append(len(fc))
+                fc.append(value)
+                category.append(cat)
+                dataset.append(ds)
+
+    keys = sorted(postings)
+    indptr, order = _csr(postings, keys)
+
+    tri = {}
+    for i, key in enumerate(keys):
+        for t in set(trigrams(key)):
+            tri.setdefault(t, []).append(i)
+    tri_keys = sorted(tri)
+    tri_indptr, tri_indices = _csr(tri, tri_keys)
+
+    np.savez_compressed(
+        path,
+        datasets=np.array(datasets),
+        keys=np.array(keys),
+        display=np.array([display[k] for k in keys]),
+        indptr=indptr,
+        dataset=np.asarray(dataset, dtype=np.int16)[order],
+        log2fc=np.asarray(fc, dtype=np.float32)[order],
+        category=np.asarray(category, dtype=np.uint8)[order],
+        trigrams=np.array(tri_keys),
+        tri_indptr=tri_indptr,
+        tri_indices=tri_indices.astype(np.int32),
+    )
+    return path
+
+
+class MoleculeIndex:
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.__dict__.update(arrays)
+        self.key_list = self.keys.tolist()
+        self.trigram_list = self.trigrams.tolist()
+        self.dataset_parts = [(d.split("/")[0],) + tuple(d.split("/")[1][:-1].split(" (", 1)) for d in self.datasets.tolist()]
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> "MoleculeIndex":
+        with np.load(path) as f:
+            return cls({k: f[k] for k in f.files})
+
+    @property
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in self.__dict__.values() if isinstance(v, np.ndarray))
+
+    def _prefix(self, query: str) -> np.ndarray:
+        lo = bisect.bisect_left(self.key_list, query)
+        hi = bisect.bisect_left(self.key_list, query + "\uffff")
+        return np.arange(lo, hi)
+
+    def _substring(self, query: str) -> np.ndarray:
+        if len(query) < 3:
+            return np.array([i for i, key in enumerate(self.key_list) if query in key], dtype=np.int64)
+        candidates = None
+        for t in set(trigrams(query)):
+            j = bisect.bisect_left(self.trigram_list, t)
+            if j == len(self.trigram_list) or self.trigram_list[j] != t:
+                return np.zeros(0, dtype=np.int64)
+            ids = self.tri_indices[self.tri_indptr[j]:self.tri_indptr[j + 1]]
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        return np.array([i for i in candidates.tolist() if query in self.key_list[i]], dtype=np.int64)
+
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """Ids of keys containing `query`: the exact match first, then prefix
+        matches, then other substring matches, each in alphabetical order."""
+        query = normalize(query)
+        if not query:
+            return []
+        prefix = self._prefix(query)
+        seen = set(prefix.tolist())
+        rest = [i for i in self._substring(query).tolist() if i not in seen]
+        return (prefix.tolist() + sorted(rest))[:limit]
+
+    def name(self, key_id: int) -> str:
+        return str(self.display[key_id])
+
+    def lookup(self, key_id: int) -> List[Dict[str, object]]:
+        """log2FC and significance of one molecule in every dataset it was measured in."""
+        lo, hi = self.indptr[key_id], self.indptr[key_id + 1]
+        rows = []
+        for ds, fc, cat in zip(self.dataset[lo:hi].tolist(), self.log2fc[lo:hi].tolist(), self.category[lo:hi].tolist()):
+            omics, organ, comp = self.dataset_parts[ds]
+            rows.append({
+                "omics": omics,
+                "organ": organ,
+                "comparison": comp,
+                "log2FC": fc,
+                "category": CATEGORIES[cat] if cat else "n.s.",
+            })
+        return rows
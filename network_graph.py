@@ -0,0 +1,307 @@
+"""In-memory graph of the trans-omics networks (network.xlsx).
+
+Every sheet of the workbook is an edge table of one workflow step. Columns are
+matched by name (see COLUMNS, case-insensitive); without a source/target column
+the first two columns are used. Missing layer columns are taken from sheet
+names of the form "<source layer>-<target layer>" (e.g. "TF-mRNA"), a missing
+condition column from "QIH"/"FIT" in the sheet name.
+
+The edges are kept as int32/int8 arrays with CSR indexes of the out- and
+in-edges of every node, so that neighborhood, path, layer and feedback-loop
+queries only touch the edges they return. Results are edge ids; to_frame() and
+to_dot() turn them into a table and a Graphviz graph.
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+NETWORK_PATH = Path("network.xlsx")
+
+# Accepted column names per field, after lower-casing and replacing spaces/hyphens with "_"
+COLUMNS = {
+    "source": ["source", "from", "regulator", "upstream", "node1", "source_node"],
+    "target": ["target", "to", "downstream", "node2", "target_node"],
+    "source_layer": ["source_layer", "source_type", "layer1", "type1"],
+    "target_layer": ["target_layer", "target_type", "layer2", "type2"],
+    "condition": ["condition", "network"],
+    "sign": ["sign", "effect", "mode", "regulation", "interaction"],
+}
+CONDITIONS = ["QIH", "FIT"]
+DIRECTIONS = {"Downstream": "down", "Upstream": "up", "Both": "both"}
+
+# Larger results are listed in full but drawn only up to this many edges.
+MAX_RENDER_EDGES = 300
+# Feedback-loop search: paths followed per step, bounding its time and memory
+MAX_LOOP_PATHS = 200_000
+
+LAYER_COLORS = ["#8dd3c7", "#ffffb3", "#bebada", "#fb8072", "#80b1d3", "#fdb462",
+                "#b3de69", "#fccde5", "#d9d9d9", "#bc80bd", "#ccebc5", "#ffed6f"]
+
+
+def _column(df: pd.DataFrame, field: str) -> Optional[str]:
+    for column in df.columns:
+        if re.sub(r"[\s\-]+", "_", str(column).strip().lower()) in COLUMNS[field]:
+            return column
+    return None
+
+
+def _sign(value) -> int:
+    """+1 for activation, -1 for inhibition, 0 if unknown."""
+    if isinstance(value, (int, float, np.number)) and not pd.isna(value):
+        return int(np.sign(value))
+    text = str(value).strip().lower()
+    if text.startswith(("+", "activ", "up", "pos", "stimul")):
+        return 1
+    if text.startswith(("-", "inhib", "down", "neg", "repress")):
+        return -1
+    return 0
+
+
+def _sheet_layers(sheet: str) -> List[str]:
+    for condition in CONDITIONS:
+        sheet = re.sub(r"\b" + condition + r"\b", "", sheet)
+    parts = [p.strip(" _()") for p in re.split(r"\s*(?:->|→|–|-|>)\s*", sheet) if p.strip(" _()")]
+    return parts if len(parts) == 2 else [sheet, sheet]
+
+
+def edge_table(sheet: str, df: pd.DataFrame) -> pd.DataFrame:
+    """One sheet as a normalized edge table (source, target, layers, condition, sign, step)."""
+    source, target = _column(df, "source"), _column(df, "target")
+    if source is None or target is None:
+        source, target = df.columns[0], df.columns[1]
+    layers = _sheet_layers(sheet)
+    out = pd.DataFrame({
+        "source": df[source].astype(str).str.strip(),
+        "target": df[target].astype(str).str.strip(),
+    })
+    for field, default in [("source_layer", layers[0]), ("target_layer", layers[1])]:
+        column = _column(df, field)
+        out[field] = df[column].astype(str).str.strip() if column is not None else default
+    column = _column(df, "condition")
+    if column is not None:
+        out["condition"] = df[column].astype(str).str.strip()
+    else:
+        out["condition"] = next((c for c in CONDITIONS if c.lower() in sheet.lower()), "")
+    column = _column(df, "sign")
+    out["sign"] = [_sign(v) for v in df[column]] if column is not None else 0
+    out["step"] = sheet
+    valid = df[source].notna() & df[target].notna()
+    return out[valid.to_numpy()]
+
+
+def _csr(rows: np.ndarray, n: int):
+    """Edge ids grouped by `rows` (CSR with n rows)."""
+    order = np.argsort(rows, kind="stable").astype(np.int32)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+    return indptr, order
+
+
+def _gather(indptr: np.ndarray, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Concatenation of values[indptr[r]:indptr[r + 1]] for every r in rows."""
+    starts, counts = indptr[rows], indptr[rows + 1] - indptr[rows]
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=values.dtype)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return values[offsets]
+
+
+class NetworkGraph:
+    def __init__(self, edges: pd.DataFrame):
+        codes, self.names = pd.factorize(pd.concat([edges["source"], edges["target"]], ignore_index=True))
+        self.names = np.asarray(self.names, dtype=str)
+        n_edges, n_nodes = len(edges), len(self.names)
+        self.src = codes[:n_edges].astype(np.int32)
+        self.dst = codes[n_edges:].astype(np.int32)
+        self.sign = edges["sign"].to_numpy(dtype=np.int8)
+        condition, self.conditions = pd.factorize(edges["condition"])
+        self.condition, self.conditions = condition.astype(np.int8), list(self.conditions)
+        step, self.steps = pd.factorize(edges["step"])
+        self.step, self.steps = step.astype(np.int16), list(self.steps)
+
+        # Layers belong to edge ends: a name can be a TF in one edge and an mRNA in the next.
+        layer, self.layers = pd.factorize(pd.concat([edges["source_layer"], edges["target_layer"]], ignore_index=True))
+        self.layers = list(self.layers)
+        self.src_layer = layer[:n_edges].astype(np.int8)
+        self.dst_layer = layer[n_edges:].astype(np.int8)
+
+        self.out_indptr, self.out_edges = _csr(self.src, n_nodes)
+        self.in_indptr, self.in_edges = _csr(self.dst, n_nodes)
+        self._ids = {name: i for i, name in enumerate(self.names.tolist())}
+        self._lower = np.char.lower(self.names)
+
+    @classmethod
+    def load(cls, path: Path = NETWORK_PATH) -> "NetworkGraph":
+        sheets = pd.read_excel(path, sheet_name=None)
+        tables = [edge_table(str(sheet), df) for sheet, df in sheets.items() if df.shape[1] >= 2]
+        return cls(pd.concat(tables, ignore_index=True))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in self.__dict__.values() if isinstance(v, np.ndarray))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def node(self, name: str) -> int:
+        return self._ids[name]
+
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """Ids of nodes whose name contains `query` (case-insensitive), prefix matches first."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        hits = np.flatnonzero(np.char.find(self._lower, query) >= 0)
+        prefix = np.char.startswith(self._lower[hits], query)
+        order = np.lexsort((self._lower[hits], ~prefix))
+        return hits[order][:limit].tolist()
+
+    def edge_mask(self, condition: Optional[str] = None, layers: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Edges of one condition (None for all) whose endpoints both lie in `layers` (None for all)."""
+        mask = np.ones(len(self.src), dtype=bool)
+        if condition is not None:
+            mask &= self.condition == (self.conditions.index(condition) if condition in self.conditions else -1)
+        if layers is not None:
+            keep = np.isin(np.arange(len(self.layers)), [self.layers.index(l) for l in layers if l in self.layers])
+            mask &= keep[self.src_layer] & keep[self.dst_layer]
+        return mask
+
+    def _step(self, frontier: np.ndarray, direction: str, mask: np.ndarray):
+        """Edges leaving `frontier` in `direction` and the nodes they reach."""
+        edges, nodes = [], []
+        if direction in ("down", "both"):
+            e = _gather(self.out_indptr, self.out_edges, frontier)
+            e = e[mask[e]]
+            edges.append(e)
+            nodes.append(self.dst[e])
+        if direction in ("up", "both"):
+            e = _gather(self.in_indptr, self.in_edges, frontier)
+            e = e[mask[e]]
+            edges.append(e)
+            nodes.append(self.src[e])
+        return np.concatenate(edges), np.concatenate(nodes)
+
+    def distances(self, seeds: Sequence[int], direction: str, mask: np.ndarray, max_hops: int = -1) -> np.ndarray:
+        """Hop distance of every node from `seeds` (-1 if unreachable)."""
+        dist = np.full(len(self.names), -1, dtype=np.int32)
+        frontier = np.unique(np.asarray(seeds, dtype=np.int64))
+        dist[frontier] = 0
+        hop = 0
+        while len(frontier) and hop != max_hops:
+            hop += 1
+            _, reached = self._step(frontier, direction, mask)
+            frontier = np.unique(reached[dist[reached] < 0])
+            dist[frontier] = hop
+        return dist
+
+    def neighborhood(self, seeds: Sequence[int], hops: int, direction: str = "both",
+                     mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Edges traversed within `hops` steps of `seeds`."""
+        mask = np.ones(len(self.src), dtype=bool) if mask is None else mask
+        dist = self.distances(seeds, direction, mask, hops)
+        inner = np.flatnonzero((dist >= 0) & (dist < hops))
+        edges, _ = self._step(inner, direction, mask)
+        return np.unique(edges)
+
+    def shortest_paths(self, source: int, target: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Edges on any shortest directed path from `source` to `target` (empty if there is none)."""
+        mask = np.ones(len(self.src), dtype=bool) if mask is None else mask
+        down = self.distances([source], "down", mask)
+        if down[target] < 0:
+            return np.zeros(0, dtype=np.int32)
+        up = self.distances([target], "up", mask)
+        length = down[target]
+        on_path = mask & (down[self.src] >= 0) & (up[self.dst] >= 0) & (down[self.src] + 1 + up[self.dst] == length)
+        return np.flatnonzero(on_path)
+
+    def feedback_loops(self, max_length: int = 4, mask: Optional[np.ndarray] = None,
+                       positive: bool = False, limit: int = 100) -> Tuple[List[np.ndarray], bool]:
+        """Directed simple cycles of at most `max_length` edges, shortest first, as
+        arrays of edge ids, and whether the search was complete. With `positive`,
+        only cycles whose edge signs are all known and multiply to +1. The search
+        stops at `limit` cycles, and follows at most MAX_LOOP_PATHS paths per step
+        (it is then incomplete)."""
+        mask = np.ones(len(self.src), dtype=bool) if mask is None else mask.copy()
+        if positive:
+            mask &= self.sign != 0
+        # Nodes on a cycle have both in- and out-edges; peel the others off.
+        while True:
+            out_deg = np.bincount(self.src[mask], minlength=len(self.names))
+            in_deg = np.bincount(self.dst[mask], minlength=len(self.names))
+            dead = (out_deg == 0) | (in_deg == 0)
+            keep = mask & ~dead[self.src] & ~dead[self.dst]
+            if keep.sum() == mask.sum():
+                break
+            mask = keep
+
+        # Grow all paths at once, one edge per step. Each cycle is found once, from
+        # its smallest node: paths only continue to nodes larger than their start.
+        # `product` is the sign product of each path, for `positive`.
+        complete = True
+        closing = np.flatnonzero(mask & (self.dst == self.src) & (self.sign > 0 if positive else True))
+        cycles = list(closing[:limit, None].astype(np.int32))
+        paths = np.flatnonzero(mask & (self.dst > self.src))[:, None].astype(np.int32)
+        product = self.sign[paths[:, 0]]
+        for length in range(2, max_length + 1):
+            if not len(paths) or len(cycles) >= limit:
+                break
+            last = self.dst[paths[:, -1]]
+            counts = self.out_indptr[last + 1] - self.out_indptr[last]
+            if counts.sum() > MAX_LOOP_PATHS:
+                n = int(np.searchsorted(np.cumsum(counts), MAX_LOOP_PATHS, side="right"))
+                paths, product, last, counts = paths[:n], product[:n], last[:n], counts[:n]
+                complete = False
+            owner = np.repeat(np.arange(len(paths)), counts)
+            e = _gather(self.out_indptr, self.out_edges, last)
+            keep = mask[e]
+            owner, e = owner[keep], e[keep]
+            start, nxt = self.src[paths[owner, 0]], self.dst[e]
+            closed = nxt == start
+            if positive:
+                closed &= product[owner] * self.sign[e] > 0
+            cycles.extend(np.column_stack([paths[owner[closed]], e[closed]])[:limit - len(cycles)])
+            if length == max_length or len(cycles) >= limit:
+                break
+            visited = (self.dst[paths[owner]] == nxt[:, None]).any(axis=1)
+            grow = (nxt > start) & ~visited
+            paths = np.column_stack([paths[owner[grow]], e[grow]])
+            product = product[owner[grow]] * self.sign[e[grow]]
+        return cycles, complete
+
+    def to_frame(self, edges: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Source": self.names[self.src[edges]],
+            "Source layer": [self.layers[i] for i in self.src_layer[edges].tolist()],
+            "Target": self.names[self.dst[edges]],
+            "Target layer": [self.layers[i] for i in self.dst_layer[edges].tolist()],
+            "Sign": self.sign[edges],
+            "Condition": [self.conditions[i] for i in self.condition[edges].tolist()],
+            "Step": [self.steps[i] for i in self.step[edges].tolist()],
+        })
+
+    def to_dot(self, edges: np.ndarray, highlight: Sequence[int] = ()) -> str:
+        """Graphviz source of (at most MAX_RENDER_EDGES of) `edges`. Nodes are colored
+        by the layer of their first drawn edge end; inhibitory edges end in a bar;
+        highlighted nodes are drawn with a bold outline."""
+        edges = edges[:MAX_RENDER_EDGES]
+        ends = np.column_stack([self.src[edges], self.dst[edges]]).ravel()
+        end_layers = np.column_stack([self.src_layer[edges], self.dst_layer[edges]]).ravel()
+        node_layer = dict(zip(ends[::-1].tolist(), end_layers[::-1].tolist()))
+        nodes = np.unique(np.concatenate([ends, np.asarray(highlight, dtype=np.int32)]))
+        highlight = set(highlight)
+        lines = ["digraph {", "rankdir=LR;", 'node [shape=box, style="rounded,filled", fontname=Arial, fontsize=10];']
+        for n in nodes.tolist():
+            lines.append('n{} [label="{}", fillcolor="{}"{}];'.format(
+                n, self.names[n].replace('"', '\\"'), LAYER_COLORS[node_layer.get(n, 0) % len(LAYER_COLORS)],
+                ", penwidth=3" if n in highlight else ""))
+        for e in edges.tolist():
+            lines.append("n{} -> n{}{};".format(self.src[e], self.dst[e], " [arrowhead=tee]" if self.sign[e] < 0 else ""))
+        lines.append("}")
+        return "\n".join(lines)
+
+    def legend(self) -> Dict[str, str]:
+        return {layer: LAYER_COLORS[i % len(LAYER_COLORS)] for i, layer in enumerate(self.layers)}
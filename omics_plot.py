@@ -0,0 +1,98 @@
+"""Volcano/MA plots as a Streamlit component.
+
+The page in omics_html/component/ is loaded once per section, and afterwards only
+receives the selected dataset as component arguments: the iframe, the Plotly
+library and the user's zoom survive reruns, and another organ/comparison is
+drawn with Plotly.react instead of reloading the page.
+
+The columns of a dataset and the feature names of each omics layer are not
+arguments themselves: they are files that the page fetches once and the browser
+caches (see generated_file), named in the arguments. What a rerun sends is the
+arguments as a whole, so changing the significance cutoffs sends only the
+categories (one byte per feature) and a few URLs and labels.
+
+Plotly is vendored in the component directory under a content-hashed name (see
+`build_assets.py`), so it is served by the app itself rather than fetched from a
+CDN. Streamlit serves component files gzipped with
+`Cache-Control: public`; `serve_assets.py` serves the same directory with
+brotli/gzip precompression and immutable caching, and is used instead when
+TORPOR_ASSET_URL is set to its address.
+"""
+import hashlib, json, os, re, uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+import streamlit.components.v1 as components
+
+import asset_cache, omics_store, perf
+
+COMPONENT_DIR = Path("./omics_html/component")
+ASSET_MANIFEST = COMPONENT_DIR / "assets.json"
+PLOTLY_VERSION = "1.58.4"
+PLOTLY_CDN = "https://cdn.plot.ly/plotly-" + PLOTLY_VERSION + ".min.js"
+# Files derived from the omics stores, served with the component
+GENERATED_DIR = COMPONENT_DIR / "data"
+
+ASSET_URL = os.environ.get("TORPOR_ASSET_URL")
+if ASSET_URL:
+    _component = components.declare_component("omics_plot", url=ASSET_URL)
+else:
+    _component = components.declare_component("omics_plot", path=str(COMPONENT_DIR))
+
+
+def plotly_src() -> str:
+    """URL of Plotly relative to the component page; the CDN if the assets are not built."""
+    if not ASSET_MANIFEST.exists():
+        return PLOTLY_CDN
+    manifest = asset_cache.CACHE.get(("asset-manifest",), [ASSET_MANIFEST],
+                                     lambda: json.loads(ASSET_MANIFEST.read_text(encoding="utf-8")))
+    return manifest["plotly"]
+
+
+def _write_generated(name: str, sources: Iterable[Path], content: Callable[[], bytes]) -> str:
+    digest = hashlib.sha256(repr(asset_cache.file_version(sources)).encode()).hexdigest()[:12]
+    stem, suffix = os.path.splitext(name)
+    path = GENERATED_DIR / (stem + "." + digest + suffix)
+    if not path.exists():
+        GENERATED_DIR.mkdir(parents=True, exist_ok=True)
+        # Write under a unique name and rename, so concurrent sessions never serve a partial file.
+        tmp = path.with_name(path.name + "." + uuid.uuid4().hex + ".tmp")
+        tmp.write_bytes(content())
+        os.replace(tmp, path)
+    return GENERATED_DIR.name + "/" + path.name
+
+
+def generated_file(name: str, sources: Iterable[Path], content: Callable[[], bytes]) -> str:
+    """URL, relative to the component page, of a file written from `sources` on first
+    use. The name carries a hash of the sources' versions, so a changed source gets a
+    new file and browsers (and serve_assets.py) can cache each one indefinitely."""
+    sources = list(sources)
+    return asset_cache.CACHE.get(("generated", name), sources, lambda: _write_generated(name, sources, content))
+
+
+def vocabulary_url(omics: str) -> str:
+    return generated_file(omics + ".names.txt", [omics_store.store_path(omics)],
+                          lambda: omics_store.vocabulary(omics).encode("utf-8"))
+
+
+def payload_url(omics: str, organ: str, comp: str, lod: bool = True) -> str:
+    # e.g. tran.Liver_QIH_vs_CNO.lod.json
+    stem = omics + "." + re.sub(r"\W+", "_", omics_store.dataset_key(organ, comp)).strip("_")
+    name = stem + (".lod" if lod else "") + ".json"
+    return generated_file(name, [omics_store.store_path(omics)],
+                          lambda: json.dumps(omics_store.payload(omics, organ, comp, lod)).encode("utf-8"))
+
+
+def dataset(omics: str, organ: str, comp: str) -> Dict[str, np.ndarray]:
+    return asset_cache.CACHE.get(("dataset", omics, organ, comp), [omics_store.store_path(omics)],
+                                 lambda: omics_store.load_dataset(omics, organ, comp))
+
+
+@perf.timed("plot")
+def omics_plot(omics: str, organ: str, comp: str, category: np.ndarray, lod: bool = True):
+    """Plot one dataset with `category` codes as returned by omics_store.classify().
+    lod=False sends every point without density bins (the behaviour before LOD)."""
+    _component(plotly_src=plotly_src(), vocabulary=vocabulary_url(omics), payload=payload_url(omics, organ, comp, lod),
+               category=omics_store.encode_category(category), key="plot-" + omics, default=None,
+               **omics_store.plot_args(omics, organ, comp))
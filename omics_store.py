@@ -0,0 +1,231 @@
+"""Columnar store behind the volcano/MA plots.
+
+`build_omics_store.py` compiles the pages under omics_html/ into one npz file per
+omics layer (omics_data/<omics>.npz). Every dataset (organ + comparison) is kept as
+Float32 x/y columns plus dictionary-encoded name and category columns (and, where
+the plot shows P-values, Benjamini-Hochberg q-values derived from them), and the
+app sends only the selected payload to the shared plot component in
+omics_html/component/ (see omics_plot.py).
+"""
+import base64
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DATA_DIR = Path("./omics_data")
+
+# Category codes stored per feature; 0 means "not significant".
+CATEGORIES = ["All", "Upregulated", "Downregulated"]
+
+# Level of detail: datasets with more features than LOD_MIN_POINTS send the gray
+# background as LOD_BINS x LOD_BINS density bins as well, and the page draws
+# individual background points only once the zoom window holds at most
+# LOD_MAX_POINTS of them.
+LOD_MIN_POINTS = 5000
+LOD_MAX_POINTS = 5000
+LOD_BINS = 200
+
+# Text and axes of each omics page, as they appeared in the original per-dataset HTML.
+OMICS = {
+    "metabo": {
+        "title": "Differentially regulated metabolites",
+        "search_placeholder": "Search for metabolites name...",
+        "select_label": "Select metabolites: ",
+        "select_default": "-- Select a metabolites --",
+        "all_label": "All metabolites",
+        "up_label": "Upregulated metabolites",
+        "down_label": "Downregulated metabolites",
+        "tip_noun": "metabolites",
+        "x_title": "log<sub>2</sub> FC",
+        "x_range": [-10, 10],
+        "y_title": "-log<sub>10</sub> P-value",
+        "hovertemplate": "<b>%{text}</b><br>log2FC: %{x:.2f}<br>-log10P: %{y:.2f}<extra></extra>",
+        "reset_x_range": [-20, 20],
+    },
+    "tran": {
+        "title": "Differentially expressed genes",
+        "search_placeholder": "Search for gene name...",
+        "select_label": "Select gene: ",
+        "select_default": "-- Select a gene --",
+        "all_label": "All genes",
+        "up_label": "Upregulated genes",
+        "down_label": "Downregulated genes",
+        "tip_noun": "gene",
+        "x_title": "log<sub>2</sub> Mean expression",
+        "x_range": [0, 30],
+        "y_title": "log<sub>2</sub> FC",
+        "hovertemplate": "<b>%{text}</b><br>Expression: %{x:.2f}<br>log2FC: %{y:.2f}<extra></extra>",
+        "reset_x_range": [0, 30],
+    },
+    "proteo": {
+        "title": "Differentially regulated proteins",
+        "search_placeholder": "Search for proteins name...",
+        "select_label": "Select proteins: ",
+        "select_default": "-- Select a protein --",
+        "all_label": "All proteins",
+        "up_label": "Upregulated proteins",
+        "down_label": "Downregulated proteins",
+        "tip_noun": "proteins",
+        "x_title": "log<sub>2</sub> FC",
+        "x_range": [-10, 10],
+        "y_title": "-log<sub>10</sub> P-value",
+        "hovertemplate": "<b>%{text}</b><br>log2FC: %{x:.2f}<br>-log10P: %{y:.2f}<extra></extra>",
+        "reset_x_range": [-20, 20],
+    },
+    "phospho": {
+        "title": "Differentially regulated phosphosites",
+        "search_placeholder": "Search for phosphosites name...",
+        "select_label": "Select phosphosites: ",
+        "select_default": "-- Select a phosphosites --",
+        "all_label": "All phosphosites",
+        "up_label": "Upregulated phosphosites",
+        "down_label": "Downregulated phosphosites",
+        "tip_noun": "phosphosite",
+        "x_title": "log<sub>2</sub> FC",
+        "x_range": [-10, 10],
+        "y_title": "-log<sub>10</sub> P-value",
+        "hovertemplate": "<b>%{text}</b><br>log2FC: %{x:.2f}<br>-log10P: %{y:.2f}<extra></extra>",
+        "reset_x_range": [0, 30],
+    },
+}
+
+# Column names of the x and y values of each omics layer in exports
+AXES = {
+    "metabo": ("log2FC", "-log10 P-value"),
+    "tran": ("log2 mean expression", "log2FC"),
+    "proteo": ("log2FC", "-log10 P-value"),
+    "phospho": ("log2FC", "-log10 P-value"),
+}
+
+# Column holding the log2 fold change in each omics layer (the other axis is
+# mean expression for RNA-seq and -log10 P-value elsewhere).
+FC_COLUMN = {"metabo": "x", "tran": "y", "proteo": "x", "phospho": "x"}
+
+# Layers whose y axis is -log10 P-value. The RNA-seq pages carry no P-values, so
+# their significance can only be narrowed by fold change.
+P_VALUE_LAYERS = ["metabo", "proteo", "phospho"]
+
+OMICS_LABELS = {"metabo": "Metabolome", "tran": "Transcriptome", "proteo": "Proteome", "phospho": "Phosphoproteome"}
+
+# (upregulated, downregulated) marker colors per comparison
+COLORS = {
+    "QIH vs CNO": ("cyan", "green"),
+    "FIT vs Ad lib": ("blue", "red"),
+    "QIH vs FIT": ("cyan", "blue"),
+}
+
+
+def dataset_key(organ: str, comp: str) -> str:
+    return organ + " (" + comp + ")"
+
+
+def store_path(omics: str) -> Path:
+    return DATA_DIR / (omics + ".npz")
+
+
+def list_datasets(omics: str) -> List[str]:
+    with np.load(store_path(omics)) as store:
+        return store["datasets"].tolist()
+
+
+def load_dataset(omics: str, organ: str, comp: str) -> Dict[str, np.ndarray]:
+    """Columns of one organ/comparison: x, y (float32), name (str), code (the line of
+    the name in vocabulary()), category (uint8 codes) and, for P_VALUE_LAYERS, q
+    (float32). Rows are in vocabulary order."""
+    key = dataset_key(organ, comp)
+    with np.load(store_path(omics)) as store:
+        order = np.argsort(store[key + "/name"], kind="stable")
+        columns = ["x", "y", "category"] + (["q"] if key + "/q" in store.files else [])
+        data = {column: store[key + "/" + column][order] for column in columns}
+        data["code"] = store[key + "/name"][order]
+        data["name"] = store["names"][data["code"]]
+        return data
+
+
+def vocabulary(omics: str) -> str:
+    """Feature names of a layer, one per line; datasets refer to them by code."""
+    with np.load(store_path(omics)) as store:
+        return "\n".join(store["names"].tolist())
+
+
+def bh_qvalues(p: np.ndarray) -> np.ndarray:
+    """Benjamini-Hochberg adjusted P-values; NaN stays NaN."""
+    q = np.full(len(p), np.nan, dtype=np.float64)
+    finite = np.flatnonzero(np.isfinite(p))
+    order = finite[np.argsort(p[finite], kind="stable")]
+    ranked = p[order] * len(order) / np.arange(1, len(order) + 1)
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+def classify(data: Dict[str, np.ndarray], omics: str, q_max: Optional[float] = None, fc_min: float = 0.0) -> np.ndarray:
+    """Category codes under the given cutoffs, in one pass over the columns. With
+    q_max None the published calls are kept and only narrowed by |log2FC| >= fc_min."""
+    fc = data[FC_COLUMN[omics]]
+    with np.errstate(invalid="ignore"):
+        if q_max is None:
+            category = data["category"]
+        else:
+            direction = np.where(fc > 0, 1, np.where(fc < 0, 2, 0))
+            category = np.where(data["q"] < q_max, direction, 0).astype(np.uint8)
+        if fc_min > 0:
+            category = np.where(np.abs(fc) >= fc_min, category, 0).astype(np.uint8)
+    return category
+
+
+def density_bins(x: np.ndarray, y: np.ndarray, bins: int = LOD_BINS) -> Dict[str, np.ndarray]:
+    """Centers and counts of the non-empty cells of a bins x bins grid over the points."""
+    finite = np.isfinite(x) & np.isfinite(y)
+    counts, x_edges, y_edges = np.histogram2d(x[finite], y[finite], bins=bins)
+    ix, iy = np.nonzero(counts)
+    return {
+        "x": ((x_edges[ix] + x_edges[ix + 1]) / 2).astype(np.float32),
+        "y": ((y_edges[iy] + y_edges[iy + 1]) / 2).astype(np.float32),
+        "count": counts[ix, iy].astype(np.uint32),
+    }
+
+
+def _b64(a: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(a, dtype=a.dtype.newbyteorder("<")).tobytes()).decode("ascii")
+
+
+def encode_payload(data: Dict[str, np.ndarray], n_names: int, lod: bool = True) -> Dict[str, object]:
+    """Columns decoded by decodeColumns() in the plot page. Names are
+    not sent: the page fetches the layer's vocabulary() once, and `present` marks
+    (as a little-endian bitmap over its n_names lines) the names of the rows, which
+    are in vocabulary order. Categories are sent separately (encode_category)."""
+    present = np.zeros(n_names, dtype=bool)
+    present[data["code"]] = True
+    payload = {
+        "x": _b64(data["x"].astype(np.float32)),
+        "y": _b64(data["y"].astype(np.float32)),
+        "categories": CATEGORIES,
+        "present": _b64(np.packbits(present, bitorder="little")),
+        "bins": None,
+        "lod_max_points": LOD_MAX_POINTS,
+    }
+    if lod and len(data["x"]) > LOD_MIN_POINTS:
+        payload["bins"] = {k: _b64(v) for k, v in density_bins(data["x"], data["y"]).items()}
+    return payload
+
+
+def encode_category(category: np.ndarray) -> str:
+    return _b64(category.astype(np.uint8))
+
+
+def payload(omics: str, organ: str, comp: str, lod: bool = True) -> Dict[str, object]:
+    """Encoded columns of one organ/comparison. With `lod` large datasets draw their
+    background from density bins until zoomed in."""
+    with np.load(store_path(omics)) as store:
+        n_names = len(store["names"])
+    return encode_payload(load_dataset(omics, organ, comp), n_names, lod)
+
+
+def plot_args(omics: str, organ: str, comp: str) -> Dict[str, object]:
+    """Labels and colors of the plot component for one organ/comparison."""
+    up_color, down_color = COLORS[comp]
+    return {
+        "dataset": omics + "/" + dataset_key(organ, comp),
+        "options": dict(OMICS[omics], up_color=up_color, down_color=down_color),
+    }
@@ -0,0 +1,81 @@
+"""Per-stage timing of app reruns.
+
+Stages are wrapped in `perf.stage(name)` or `@perf.timed(name)`: cache loads
+("load:<kind>"), figures, plots, download registration, export writes, and each
+section as a whole. Timings are only collected when TORPOR_PERF is set or
+enable() was called (as bench.py does); otherwise a stage costs one flag check.
+Totals are process-wide, like the asset cache.
+"""
+import functools, os, resource, threading, time
+from contextlib import contextmanager
+from typing import Dict
+
+ENABLED = bool(os.environ.get("TORPOR_PERF"))
+
+_lock = threading.Lock()
+_stats: Dict[str, list] = {}  # stage -> [count, seconds, max seconds]
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def record(name: str, seconds: float):
+    with _lock:
+        entry = _stats.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+@contextmanager
+def stage(name: str):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator running the whole function as one stage."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    with _lock:
+        return {name: {"count": c, "seconds": s, "max_seconds": m} for name, (c, s, m) in sorted(_stats.items())}
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def io_counters() -> Dict[str, int]:
+    """Bytes read by this process: `rchar` counts every read() (including the page
+    cache), `read_bytes` only what came from the storage device. Empty where
+    /proc/self/io is not available."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        return {}
+    return {"rchar": int(fields["rchar"]), "read_bytes": int(fields["read_bytes"])}
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
@@ -0,0 +1,60 @@
+"""Serve the omics plot component with precompressed, immutable assets.
+
+Usage: python serve_assets.py [--port 8502] [--bind 0.0.0.0]
+Then start the app with TORPOR_ASSET_URL=http://<host>:8502/ (see omics_plot.py).
+
+Content-hashed files (as written by build_assets.py) are sent with
+`Cache-Control: public, max-age=31536000, immutable` and, when the browser accepts
+it, as their precompressed .br or .gz copy. index.html is revalidated on every
+load, so that a rebuilt asset name is picked up.
+"""
+import argparse, mimetypes, re
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from omics_plot import COMPONENT_DIR
+
+HASHED = re.compile(r"\.[0-9a-f]{12}\.")
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+class AssetHandler(SimpleHTTPRequestHandler):
+
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and self.path.split("?")[0].endswith("/"):
+            path = path / "index.html"
+        if not path.is_file():
+            return super().send_head()
+        accepted = [e.strip().split(";")[0] for e in self.headers.get("Accept-Encoding", "").split(",")]
+        encoding, body = None, path
+        for name, suffix in ENCODINGS:
+            if name in accepted and path.with_name(path.name + suffix).is_file():
+                encoding, body = name, path.with_name(path.name + suffix)
+                break
+        f = open(body, "rb")
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(body.stat().st_size))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if HASHED.search(path.name):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Last-Modified", self.date_time_string(int(path.stat().st_mtime)))
+        self.end_headers()
+        return f
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--bind", default="0.0.0.0")
+    args = parser.parse_args()
+    handler = partial(AssetHandler, directory=str(COMPONENT_DIR.resolve()))
+    with ThreadingHTTPServer((args.bind, args.port), handler) as server:
+        print("Serving", COMPONENT_DIR, "on port", args.port)
+        server.serve_forever()
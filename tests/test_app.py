@@ -0,0 +1,63 @@
+"""Regression tests driving the app headlessly with Streamlit's AppTest.
+
+Run from anywhere with `python -m pytest tests`; the app reads its data relative
+to the repository root.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import network_graph  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    network = tmp_path / "network.xlsx"
+    with pd.ExcelWriter(network) as writer:
+        pd.DataFrame({
+            "Source": ["Hif1a", "Hif3a", "Alb", "Albumin", "Hif1a"],
+            "Target": ["Alb", "Alb", "Hif3a", "Hif1a", "Albumin"],
+            "Effect": ["activation", "activation", "inhibition", "activation", "activation"],
+        }).to_excel(writer, sheet_name="QIH TF-mRNA", index=False)
+    monkeypatch.setattr(network_graph, "NETWORK_PATH", network)
+    return AppTest.from_file(str(ROOT / "main.py"), default_timeout=60).run()
+
+
+def check(at):
+    assert not at.exception, [e.value for e in at.exception]
+
+
+def chosen(at, key: str) -> str:
+    """Label shown by a selectbox (its value is a node or molecule id)."""
+    box = at.selectbox(key=key)
+    return box.options[box.index].lower()
+
+
+def test_second_query_in_molecule_search(app):
+    app.radio(key="section").set_value("Molecule search").run()
+    for query in ["hif", "alb"]:
+        app.text_input(key="search").input(query).run()
+        check(app)
+        assert query in chosen(app, "search-hit")
+
+
+def test_second_query_in_network_explorer(app):
+    app.radio(key="section").set_value("Trans-omics network").run()
+    for query in ["hif", "alb"]:
+        app.text_input(key="net-node").input(query).run()
+        check(app)
+        assert query in chosen(app, "net-node-hit")
+
+    app.radio(key="net-query").set_value("Path").run()
+    app.text_input(key="net-from").input("hif1").run()
+    for query in ["alb", "hif3"]:
+        app.text_input(key="net-to").input(query).run()
+        check(app)
+        assert query in chosen(app, "net-to-hit")
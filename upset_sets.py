@@ -0,0 +1,105 @@
+"""Bitset index of the significant-feature memberships in upset_plot.xlsx.
+
+Each sheet ("<layer> (<organ>, increased|decreased)") lists the exclusive
+intersections of the three comparisons with their members. They are compiled
+into one bitset per (organ, comparison, direction) over the features of each
+omics layer, so that intersections, unions and differences of any sets are a
+few word-wise AND/OR/NOT operations and a popcount.
+"""
+import re
+from itertools import compress
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+UPSET_PATH = Path("upset_plot.xlsx")
+
+# Sheet name prefix of each omics layer in upset_plot.xlsx
+UPSET_PREFIX = {"metabo": "Metabo", "tran": "mRNA", "proteo": "Protein", "phospho": "Phospho"}
+
+# Comparison names in the Condition column
+COMPARISONS = {"QIH/CNO": "QIH vs CNO", "FIT/Ad lib": "FIT vs Ad lib", "QIH/FIT": "QIH vs FIT"}
+DIRECTIONS = {"increased": "Up", "decreased": "Down"}
+
+SHEET_NAME = re.compile(r"^(\w+) \((\w+),\s*(increased|decreased)\)$")
+
+
+def parse_sheet(sheet: str) -> Tuple[str, str, str]:
+    """(omics, organ, direction) of a sheet name such as "mRNA (Liver,decreased)"."""
+    prefix, organ, direction = SHEET_NAME.match(sheet).groups()
+    omics = next(k for k, v in UPSET_PREFIX.items() if v == prefix)
+    return omics, organ, DIRECTIONS[direction]
+
+
+class MembershipSets:
+    """Sets of one omics layer, as rows of a (sets x words) uint64 bit matrix."""
+
+    def __init__(self, names: List[str], labels: List[Tuple[str, str, str]], members: List[List[str]]):
+        self.names = np.array(sorted(set(names)))
+        self.labels = labels
+        self.bits = np.zeros((len(labels), (len(self.names) + 63) // 64), dtype=np.uint64)
+        for row, names in enumerate(members):
+            self.bits[row] = self._pack(np.searchsorted(self.names, names))
+
+    def _pack(self, ids: np.ndarray) -> np.ndarray:
+        flags = np.zeros(self.bits.shape[1] * 64, dtype=bool)
+        flags[ids] = True
+        return np.packbits(flags, bitorder="little").view(np.uint64)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes + self.names.nbytes
+
+    def label(self, set_id: int) -> str:
+        return " · ".join(self.labels[set_id])
+
+    def combine(self, include: Sequence[int], exclude: Sequence[int] = (), mode: str = "all") -> np.ndarray:
+        """Bitset of the features in all (mode="all") or any (mode="any") of the
+        `include` sets and in none of the `exclude` sets."""
+        if include:
+            op = np.bitwise_and if mode == "all" else np.bitwise_or
+            bits = op.reduce(self.bits[list(include)], axis=0)
+        else:
+            bits = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        if exclude:
+            bits = bits & ~np.bitwise_or.reduce(self.bits[list(exclude)], axis=0)
+        return bits
+
+    @staticmethod
+    def count(bits: np.ndarray) -> int:
+        return int(np.bitwise_count(bits).sum())
+
+    def members(self, bits: np.ndarray) -> List[str]:
+        flags = np.unpackbits(bits.view(np.uint8), bitorder="little")[:len(self.names)]
+        return self.names[flags.astype(bool)].tolist()
+
+    def intersections(self, set_ids: Sequence[int]) -> List[Tuple[Tuple[int, ...], int]]:
+        """Exclusive intersections of `set_ids` as in an UpSet plot: (sets, size) for
+        every non-empty combination of membership, largest first."""
+        rows = self.bits[list(set_ids)]
+        flags = np.unpackbits(rows.view(np.uint8), axis=1, bitorder="little")[:, :len(self.names)]
+        signature = (flags.astype(np.int64) << np.arange(len(set_ids))[:, None]).sum(axis=0)
+        counts = np.bincount(signature, minlength=2 ** len(set_ids))
+        result = [(tuple(compress(set_ids, ((s >> np.arange(len(set_ids))) & 1).tolist())), int(c))
+                  for s, c in enumerate(counts.tolist()) if s and c]
+        return sorted(result, key=lambda r: -r[1])
+
+
+def load(path: Path = UPSET_PATH) -> Dict[str, MembershipSets]:
+    """MembershipSets of every omics layer in the workbook."""
+    layers = {}
+    for sheet, df in pd.read_excel(path, sheet_name=None).items():
+        omics, organ, direction = parse_sheet(sheet)
+        sets = layers.setdefault(omics, {})
+        for condition, members in zip(df["Condition"].astype(str), df[df.columns[2]].astype(str)):
+            members = [m.strip() for m in members.split(", ")]
+            for comparison in condition.split(" & "):
+                sets.setdefault((organ, COMPARISONS[comparison.strip()], direction), []).extend(members)
+    result = {}
+    for omics, sets in layers.items():
+        labels = list(sets)
+        names = [name for members in sets.values() for name in members]
+        result[omics] = MembershipSets(names, labels, [sets[label] for label in labels])
+    return result